@@ -93,8 +93,37 @@ export async function confirmInvoice(data: ProcessedData): Promise<void> {
 // =======================
 // Obtener facturas
 // =======================
-export async function getInvoices(): Promise<Invoice[]> {
-  const response = await fetch(`${API_BASE_URL}/facturas`)
+export interface InvoiceFilters {
+  busqueda?: string // número de factura o proveedor
+  cuit_emisor?: string
+  razon_social?: string
+  tipo_factura?: string
+  fecha_desde?: string // dd/mm/aaaa
+  fecha_hasta?: string // dd/mm/aaaa
+  total_min?: number
+  total_max?: number
+  orden?: "fecha" | "total" | "numero_factura" | "id"
+  direccion?: "asc" | "desc"
+  limite?: number
+  cursor?: string
+}
+
+export interface InvoicePage {
+  items: Invoice[]
+  siguiente_cursor: string | null
+}
+
+// Devuelve una página; para la siguiente pasar cursor = siguiente_cursor
+export async function getInvoices(filters: InvoiceFilters = {}): Promise<InvoicePage> {
+  const params = new URLSearchParams()
+  for (const [key, value] of Object.entries(filters)) {
+    if (value !== undefined && value !== null && value !== "") {
+      params.append(key, String(value))
+    }
+  }
+
+  const query = params.toString()
+  const response = await fetch(`${API_BASE_URL}/facturas${query ? `?${query}` : ""}`)
 
   if (!response.ok) {
     throw new Error("Failed to fetch invoices")
@@ -103,6 +132,20 @@ export async function getInvoices(): Promise<Invoice[]> {
   return response.json()
 }
 
+// Recorre todas las páginas con los mismos filtros (para exportar)
+export async function getAllInvoices(filters: InvoiceFilters = {}): Promise<Invoice[]> {
+  const invoices: Invoice[] = []
+  let cursor: string | undefined
+
+  do {
+    const page = await getInvoices({ ...filters, limite: 200, cursor })
+    invoices.push(...page.items)
+    cursor = page.siguiente_cursor ?? undefined
+  } while (cursor)
+
+  return invoices
+}
+
 export async function getInvoiceById(id: number): Promise<Invoice> {
   const response = await fetch(`${API_BASE_URL}/facturas/${id}`)
 
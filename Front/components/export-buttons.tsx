@@ -1,28 +1,44 @@
 "use client"
 
+import { useState } from "react"
 import { motion } from "framer-motion"
 import { Download, FileJson } from "lucide-react"
 import { Button } from "@/components/ui/button"
 import { useToast } from "@/hooks/use-toast"
-import { Invoice } from "@/api/facturas"
+import { getAllInvoices, Invoice, InvoiceFilters } from "@/api/facturas"
 
 interface ExportButtonsProps {
-  invoices: Invoice[]
+  filters: InvoiceFilters
 }
 
-export default function ExportButtons({ invoices = [] }: ExportButtonsProps) {
+export default function ExportButtons({ filters }: ExportButtonsProps) {
   const { toast } = useToast()
+  const [isExporting, setIsExporting] = useState(false)
 
-  const exportToCSV = () => {
-    if (!invoices || invoices.length === 0) {
+  // Exporta todas las facturas que cumplen los filtros, no solo las
+  // páginas que ya se cargaron en la tabla
+  const exportToCSV = async () => {
+    setIsExporting(true)
+    let invoices: Invoice[]
+    try {
+      invoices = await getAllInvoices(filters)
+    } catch (err) {
+      console.error("Failed to export invoices:", err)
+      toast({ title: "Error", description: "No se pudieron obtener las facturas", variant: "destructive" })
+      return
+    } finally {
+      setIsExporting(false)
+    }
+
+    if (invoices.length === 0) {
       toast({ title: "No data", description: "No hay facturas para exportar", variant: "destructive" })
       return
     }
 
     const headers = ["Numero Factura","Tipo Factura", "Fecha", "Proveedor", "CUIT", "Total"]
-    const rows = invoices?.map((inv) => [inv.numero_factura,inv.tipo_factura, inv.fecha, inv.razon_social, inv.cuit_emisor, inv.total])
+    const rows = invoices.map((inv) => [inv.numero_factura,inv.tipo_factura, inv.fecha, inv.razon_social, inv.cuit_emisor, inv.total])
 
-    const csv = [headers.join(","), ...rows?.map((row) => row.join(","))].join("\n")
+    const csv = [headers.join(","), ...rows.map((row) => row.join(","))].join("\n")
 
     const blob = new Blob([csv], { type: "text/csv" })
     const url = window.URL.createObjectURL(blob)
@@ -38,9 +54,9 @@ export default function ExportButtons({ invoices = [] }: ExportButtonsProps) {
 
   return (
     <motion.div initial={{ opacity: 0 }} animate={{ opacity: 1 }} className="flex gap-2">
-      <Button variant="outline" onClick={exportToCSV} className="gap-2 bg-transparent">
+      <Button variant="outline" onClick={exportToCSV} disabled={isExporting} className="gap-2 bg-transparent">
         <FileJson className="h-4 w-4" />
-        Exportar CSV
+        {isExporting ? "Exportando..." : "Exportar CSV"}
       </Button>
 
     </motion.div>
@@ -7,7 +7,7 @@ import { Button } from "@/components/ui/button"
 import FiltersBar from "@/components/filters-bar"
 import InvoiceTable from "@/components/invoice-table"
 import ExportButtons from "@/components/export-buttons"
-import { getInvoices, TablaItem, deleteInvoice } from "@/api/facturas"
+import { getInvoices, TablaItem, deleteInvoice, InvoiceFilters } from "@/api/facturas"
 import EditInvoicePage from "@/components/pages/edit-invoice-page"
 
 interface Invoice {
@@ -27,66 +27,63 @@ interface InvoicesPageProps {
 
 export default function InvoicesPage({ onNavigate }: InvoicesPageProps) {
   const [invoices, setInvoices] = useState<Invoice[]>([])
-  const [filteredInvoices, setFilteredInvoices] = useState<Invoice[]>([])
   const [isLoading, setIsLoading] = useState(true)
   const [searchTerm, setSearchTerm] = useState("")
   const [dateFilter, setDateFilter] = useState("")
   const [providerFilter, setProviderFilter] = useState("")
   const [editingInvoice, setEditingInvoice] = useState<Invoice | null>(null)
   const [isDeleting, setIsDeleting] = useState<number | null>(null)
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [isLoadingMore, setIsLoadingMore] = useState(false)
 
+  // Todos los filtros se aplican en el backend, así la búsqueda y la
+  // exportación cubren todas las facturas y no solo las páginas cargadas.
+  // Se espera a que el usuario deje de escribir antes de volver a pedir la
+  // primera página.
   useEffect(() => {
-    loadInvoices()
-  }, [])
-
-  useEffect(() => {
-    filterInvoices()
-  }, [invoices, searchTerm, dateFilter, providerFilter])
+    const timeout = setTimeout(() => loadInvoices(), 300)
+    return () => clearTimeout(timeout)
+  }, [searchTerm, dateFilter, providerFilter])
+
+  const serverFilters = (): InvoiceFilters => {
+    // dateFilter viene del input date como YYYY-MM-DD
+    const fecha = dateFilter ? dateFilter.split("-").reverse().join("/") : undefined
+    return {
+      busqueda: searchTerm.trim() || undefined,
+      razon_social: providerFilter || undefined,
+      fecha_desde: fecha,
+      fecha_hasta: fecha,
+    }
+  }
 
   const loadInvoices = async () => {
     setIsLoading(true)
     try {
-      const data = await getInvoices()
-      setInvoices(data)
+      const page = await getInvoices(serverFilters())
+      setInvoices(page.items)
+      setNextCursor(page.siguiente_cursor)
     } catch (err) {
       console.error("Failed to load invoices:", err)
       setInvoices([])
+      setNextCursor(null)
     } finally {
       setIsLoading(false)
     }
   }
 
-  const filterInvoices = () => {
-    let filtered = invoices
-
-    if (searchTerm) {
-      filtered = filtered.filter(
-        (inv) =>
-          inv.numero_factura.toLowerCase().includes(searchTerm.toLowerCase()) ||
-          inv.razon_social.toLowerCase().includes(searchTerm.toLowerCase())
-      )
-    }
-
-    if (dateFilter) {
-      filtered = filtered.filter((inv) => {
-      if (!inv.fecha) return false
-
-      // inv.fecha = "DD/MM/YYYY"
-      const [day, month, year] = inv.fecha.split("/")
+  const loadMore = async () => {
+    if (!nextCursor) return
 
-      const normalizedInvoiceDate = `${year}-${month.padStart(2, "0")}-${day.padStart(2, "0")}`
-
-      return normalizedInvoiceDate === dateFilter
-      })
-    }
-
-    if (providerFilter) {
-      filtered = filtered.filter((inv) =>
-        inv.razon_social.toLowerCase().includes(providerFilter.toLowerCase())
-      )
+    setIsLoadingMore(true)
+    try {
+      const page = await getInvoices({ ...serverFilters(), cursor: nextCursor })
+      setInvoices((prev) => [...prev, ...page.items])
+      setNextCursor(page.siguiente_cursor)
+    } catch (err) {
+      console.error("Failed to load more invoices:", err)
+    } finally {
+      setIsLoadingMore(false)
     }
-
-    setFilteredInvoices(filtered)
   }
 
   const handleEdit = (invoice: Invoice) => {
@@ -173,7 +170,7 @@ export default function InvoicesPage({ onNavigate }: InvoicesPageProps) {
           transition={{ duration: 0.5, delay: 0.15 }}
           className="mb-6"
         >
-          <ExportButtons invoices={filteredInvoices} />
+          <ExportButtons filters={serverFilters()} />
         </motion.div>
 
         {/* Tabla con acciones */}
@@ -183,12 +180,20 @@ export default function InvoicesPage({ onNavigate }: InvoicesPageProps) {
           transition={{ duration: 0.5, delay: 0.2 }}
         >
           <InvoiceTable
-            invoices={filteredInvoices}
+            invoices={invoices}
             isLoading={isLoading}
             onEdit={handleEdit}
             onDelete={handleDelete}
             deletingId={isDeleting}
           />
+
+          {nextCursor && (
+            <div className="mt-6 flex justify-center">
+              <Button variant="outline" onClick={loadMore} disabled={isLoadingMore}>
+                {isLoadingMore ? "Cargando..." : "Cargar más"}
+              </Button>
+            </div>
+          )}
         </motion.div>
       </div>
     </div>
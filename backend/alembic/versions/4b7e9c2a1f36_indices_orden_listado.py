@@ -0,0 +1,40 @@
+"""indices orden listado
+
+Revision ID: 4b7e9c2a1f36
+Revises: 9e3a5d1c7b42
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b7e9c2a1f36'
+down_revision: Union[str, Sequence[str], None] = '9e3a5d1c7b42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Un índice (columna, id) por cada orden del listado. Sirve en los dos
+# sentidos (recorrido hacia atrás para desc), para la comparación de filas
+# (columna, id) < (valor, id) del cursor y para el tramo de NULL por id.
+INDICES = {
+    'ix_facturas_fecha_id': ['fecha', 'id'],
+    'ix_facturas_total_id': ['total', 'id'],
+    'ix_facturas_numero_factura_id': ['numero_factura', 'id'],
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for nombre, columnas in INDICES.items():
+        op.create_index(nombre, 'facturas', columnas, unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for nombre in reversed(list(INDICES)):
+        op.drop_index(nombre, table_name='facturas')
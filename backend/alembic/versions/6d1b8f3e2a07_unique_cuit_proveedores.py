@@ -0,0 +1,48 @@
+"""unique cuit proveedores
+
+Revision ID: 6d1b8f3e2a07
+Revises: 4b7e9c2a1f36
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6d1b8f3e2a07'
+down_revision: Union[str, Sequence[str], None] = '4b7e9c2a1f36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# El alta de proveedores hace INSERT ... ON CONFLICT (cuit_emisor), que
+# necesita una restricción UNIQUE sobre esa columna sola. Las bases que
+# vienen de v1 ya la tienen (proveedores_cuit_key, renombrada junto con la
+# columna): solo se crea si falta.
+
+NOMBRE = 'proveedores_cuit_emisor_key'
+
+
+def _unica_sobre_cuit():
+    inspector = sa.inspect(op.get_bind())
+    return next(
+        (u['name'] for u in inspector.get_unique_constraints('proveedores')
+         if u['column_names'] == ['cuit_emisor']),
+        None
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if _unica_sobre_cuit() is None:
+        op.create_unique_constraint(NOMBRE, 'proveedores', ['cuit_emisor'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Solo se borra la que creó esta migración
+    if _unica_sobre_cuit() == NOMBRE:
+        op.drop_constraint(NOMBRE, 'proveedores', type_='unique')
@@ -0,0 +1,36 @@
+"""indices listado facturas
+
+Revision ID: 8c1f2a7d4e90
+Revises: d5bf50445273
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c1f2a7d4e90'
+down_revision: Union[str, Sequence[str], None] = 'd5bf50445273'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# La fecha no lleva índice propio: ix_facturas_fecha_id (fecha, id) ya
+# cubre los filtros por rango de fechas (ver 4b7e9c2a1f36)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_facturas_proveedor_id'), 'facturas', ['proveedor_id'], unique=False)
+    op.create_index(op.f('ix_facturas_tipo_factura'), 'facturas', ['tipo_factura'], unique=False)
+    op.create_index(op.f('ix_detalle_factura_factura_id'), 'detalle_factura', ['factura_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_detalle_factura_factura_id'), table_name='detalle_factura')
+    op.drop_index(op.f('ix_facturas_tipo_factura'), table_name='facturas')
+    op.drop_index(op.f('ix_facturas_proveedor_id'), table_name='facturas')
@@ -0,0 +1,65 @@
+"""alinear columnas modelos
+
+Revision ID: 9e3a5d1c7b42
+Revises: 8c1f2a7d4e90
+Create Date: 2026-10-18 16:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e3a5d1c7b42'
+down_revision: Union[str, Sequence[str], None] = '8c1f2a7d4e90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# La migración v1 creó las columnas con otros nombres que los modelos. Hay
+# bases que ya se alinearon a mano (o con create_all), así que cada cambio
+# se aplica solo si la columna o la restricción todavía está como en v1.
+# PostgreSQL conserva las restricciones al renombrar: la UNIQUE de cuit
+# pasa a cubrir cuit_emisor (ver 6d1b8f3e2a07).
+
+RENOMBRES = [
+    ('proveedores', 'nombre', 'razon_social'),
+    ('proveedores', 'cuit', 'cuit_emisor'),
+    ('facturas', 'numero', 'numero_factura'),
+    ('detalle_factura', 'precio_unitario', 'subtotal'),
+]
+
+
+def _columnas(tabla):
+    return {c['name'] for c in sa.inspect(op.get_bind()).get_columns(tabla)}
+
+
+def _unicas(tabla):
+    inspector = sa.inspect(op.get_bind())
+    return {u['name'] for u in inspector.get_unique_constraints(tabla)}
+
+
+def _renombrar(tabla, anterior, nuevo):
+    columnas = _columnas(tabla)
+    if anterior in columnas and nuevo not in columnas:
+        op.alter_column(tabla, anterior, new_column_name=nuevo)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for tabla, anterior, nuevo in RENOMBRES:
+        _renombrar(tabla, anterior, nuevo)
+
+    if 'facturas_numero_factura_key' not in _unicas('facturas'):
+        op.create_unique_constraint('facturas_numero_factura_key', 'facturas', ['numero_factura'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if 'facturas_numero_factura_key' in _unicas('facturas'):
+        op.drop_constraint('facturas_numero_factura_key', 'facturas', type_='unique')
+
+    for tabla, anterior, nuevo in reversed(RENOMBRES):
+        _renombrar(tabla, nuevo, anterior)
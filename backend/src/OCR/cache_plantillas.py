@@ -0,0 +1,186 @@
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from core.config import settings
+from shared import metricas
+
+# ==============================
+# CACHÉ DE PLANTILLAS (LAYOUT)
+# ==============================
+# Las facturas de un mismo proveedor comparten el layout, así que las cajas
+# que encuentra YOLO casi no se mueven. Se guarda una huella estructural de
+# la página (máscara de tinta en una grilla chica) junto con sus cajas; si
+# una página nueva tiene una huella lo bastante parecida se reutilizan las
+# cajas y no se corre el modelo.
+#
+# Para detectar cambios de plantilla se verifica con YOLO cada
+# PLANTILLAS_VERIFICAR_CADA aciertos y cuando la coincidencia es justa.
+#
+# Las plantillas viven en cada worker de extracción; los aciertos y fallos
+# se cuentan como métricas (gd_plantillas_*), que vuelven con cada resultado
+# y se suman en el proceso de la API para /ready y /metrics.
+
+GRILLA = (48, 68)  # ancho x alto, proporción A4
+
+IOU_MINIMO_VERIFICACION = 0.8
+
+CONTADORES = {
+    "hits": "gd_plantillas_hits_total",
+    "misses": "gd_plantillas_misses_total",
+    "verificaciones": "gd_plantillas_verificaciones_total",
+    "derivas": "gd_plantillas_derivas_total",
+    "tiempo_ahorrado_s": "gd_plantillas_ahorrado_segundos_total",
+}
+
+_entradas = OrderedDict()  # id -> {"huella", "shape", "cajas", "hits"}
+_lock = threading.Lock()
+_siguiente_id = 0
+
+_tiempo_deteccion_medio = None
+
+
+def huella_pagina(img):
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    chica = cv2.resize(gray, GRILLA, interpolation=cv2.INTER_AREA)
+    # Celdas con tinta: líneas, recuadros y bloques de texto de la plantilla
+    return (chica < 200).ravel()
+
+
+def _iou(a, b):
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, ix2 - ix1) * max(0.0, iy2 - iy1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def _misma_disposicion(cajas_a, cajas_b):
+    por_clase_a = {cls_id: xyxy for cls_id, _, xyxy in cajas_a}
+    por_clase_b = {cls_id: xyxy for cls_id, _, xyxy in cajas_b}
+
+    if por_clase_a.keys() != por_clase_b.keys():
+        return False
+
+    return all(
+        _iou(por_clase_a[c], por_clase_b[c]) >= IOU_MINIMO_VERIFICACION
+        for c in por_clase_a
+    )
+
+
+def _buscar(huella, shape):
+    mejor_id, mejor_dist = None, 1.0
+
+    for entrada_id, entrada in _entradas.items():
+        if entrada["shape"] != shape:
+            continue
+        dist = float(np.count_nonzero(entrada["huella"] != huella)) / huella.size
+        if dist < mejor_dist:
+            mejor_id, mejor_dist = entrada_id, dist
+
+    return mejor_id, mejor_dist
+
+
+def _guardar(huella, shape, cajas):
+    global _siguiente_id
+
+    # Solo se cachean layouts completos (todas las clases detectadas una vez)
+    if len({cls_id for cls_id, _, _ in cajas}) < settings.PLANTILLAS_MIN_CLASES:
+        return
+
+    _entradas[_siguiente_id] = {"huella": huella, "shape": shape, "cajas": cajas, "hits": 0}
+    _siguiente_id += 1
+    while len(_entradas) > settings.PLANTILLAS_MAX:
+        _entradas.popitem(last=False)
+
+
+def consultar_plantilla(img):
+
+    # Devuelve (cajas, consulta). Si cajas no es None la página coincide con
+    # una plantilla conocida y no hace falta correr YOLO; si no, hay que
+    # detectar y pasar el resultado a registrar_deteccion(consulta, ...).
+
+    if not settings.PLANTILLAS_CACHE:
+        return None, None
+
+    huella = huella_pagina(img)
+    consulta = {"huella": huella, "shape": img.shape[:2], "entrada_id": None}
+    umbral = settings.PLANTILLAS_DISTANCIA_MAX
+
+    with _lock:
+        entrada_id, dist = _buscar(huella, consulta["shape"])
+
+        if entrada_id is None or dist > umbral:
+            metricas.incrementar(CONTADORES["misses"])
+            return None, consulta
+
+        entrada = _entradas[entrada_id]
+        _entradas.move_to_end(entrada_id)
+        entrada["hits"] += 1
+
+        if entrada["hits"] % settings.PLANTILLAS_VERIFICAR_CADA == 0 or dist > umbral / 2:
+            # Coincidencia a verificar con el modelo
+            metricas.incrementar(CONTADORES["verificaciones"])
+            consulta["entrada_id"] = entrada_id
+            return None, consulta
+
+        metricas.incrementar(CONTADORES["hits"])
+        metricas.incrementar(CONTADORES["tiempo_ahorrado_s"], _tiempo_deteccion_medio or 0.0)
+        return entrada["cajas"], consulta
+
+
+def registrar_deteccion(consulta, cajas, segundos):
+    global _tiempo_deteccion_medio
+
+    if consulta is None:
+        return
+
+    with _lock:
+        if _tiempo_deteccion_medio is None:
+            _tiempo_deteccion_medio = segundos
+        else:
+            _tiempo_deteccion_medio = 0.9 * _tiempo_deteccion_medio + 0.1 * segundos
+
+        entrada = _entradas.get(consulta["entrada_id"]) if consulta["entrada_id"] is not None else None
+
+        if entrada is None:
+            _guardar(consulta["huella"], consulta["shape"], cajas)
+        elif not _misma_disposicion(entrada["cajas"], cajas):
+            # La plantilla cambió: se reemplazan las cajas guardadas
+            metricas.incrementar(CONTADORES["derivas"])
+            entrada["cajas"] = cajas
+            entrada["huella"] = consulta["huella"]
+
+
+def detectar_con_plantillas(img, detectar, gray=None):
+
+    # detectar(img) -> lista de cajas (cls_id, conf, xyxy). gray: la página
+    # en grises ya calculada, para no volver a convertirla
+
+    cajas, consulta = consultar_plantilla(img if gray is None else gray)
+    if cajas is not None:
+        return cajas
+
+    inicio = time.perf_counter()
+    cajas = detectar(img)
+    registrar_deteccion(consulta, cajas, time.perf_counter() - inicio)
+    return cajas
+
+
+def estadisticas_plantillas():
+
+    # Totales de todos los workers (ver shared/metricas.py)
+
+    estadisticas = {clave: metricas.total(nombre) for clave, nombre in CONTADORES.items()}
+    consultas = estadisticas["hits"] + estadisticas["misses"] + estadisticas["verificaciones"]
+
+    return {
+        "activa": settings.PLANTILLAS_CACHE,
+        "consultas": consultas,
+        **estadisticas,
+        "tiempo_ahorrado_s": round(estadisticas["tiempo_ahorrado_s"], 2),
+        "hit_rate": round(estadisticas["hits"] / consultas, 3) if consultas else 0.0,
+    }
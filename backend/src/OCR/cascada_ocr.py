@@ -0,0 +1,108 @@
+import datetime
+import re
+
+from core.config import settings
+from OCR.normalizar_ocr import (
+    normalizar_cuit, normalizar_fecha, normalizar_total, normalizar_tipo_factura
+)
+from OCR.ocr_concurrente import ocr_rois_concurrente
+from OCR.perfiles_ocr import perfiles_reintento
+
+# ============================================================
+# CASCADA DE OCR: PRIMERO LO BARATO
+# ============================================================
+# La primera pasada usa el perfil rápido de cada campo (PERFILES_OCR). Los
+# campos cuyo texto no pasa su validación se vuelven a leer con los perfiles
+# más caros de perfiles_reintento() (reescalado, umbral adaptativo, otro
+# psm), de a uno por pasada y hasta OCR_CASCADA_MAX_PASADAS. Los campos sin
+# validador se aceptan en la primera pasada.
+
+MULTIPLICADORES_CUIT = (5, 4, 3, 2, 7, 6, 5, 4, 3, 2)
+
+
+def cuit_valido(texto, contexto=None):
+    digitos = re.sub(r"\D", "", normalizar_cuit(texto))
+    if len(digitos) != 11:
+        return False
+
+    resto = sum(int(d) * m for d, m in zip(digitos, MULTIPLICADORES_CUIT)) % 11
+    verificador = {0: 0, 1: 9}.get(resto, 11 - resto)
+    return verificador == int(digitos[10])
+
+
+def fecha_valida(texto, contexto=None):
+    try:
+        datetime.datetime.strptime(normalizar_fecha(texto), "%d/%m/%Y")
+        return True
+    except ValueError:
+        return False
+
+
+def tipo_factura_valido(texto, contexto=None):
+    return normalizar_tipo_factura(texto) in ("A", "B", "C")
+
+
+def total_valido(texto, contexto=None):
+
+    # Con items leídos el total tiene que coincidir con la suma de los
+    # subtotales; sin items alcanza con que sea un importe
+
+    try:
+        total = float(normalizar_total(texto))
+    except ValueError:
+        return False
+
+    items = (contexto or {}).get("items")
+    if not items:
+        return True
+    return abs(total - sum(item["subtotal"] for item in items)) <= 0.01
+
+
+VALIDADORES = {
+    "cuit_emisor": cuit_valido,
+    "fecha": fecha_valida,
+    "tipo_factura": tipo_factura_valido,
+    "total": total_valido,
+}
+
+
+def reintentar_invalidos(rois, textos, contexto=None):
+
+    # rois / textos: dict campo -> recorte / texto de la primera pasada.
+    # Reintenta solo los campos inválidos y devuelve (textos, pasadas), con
+    # pasadas: dict campo -> cantidad de lecturas hechas. Si ninguna pasada
+    # valida, queda el texto de la primera.
+
+    textos = dict(textos)
+    pasadas = {campo: 1 for campo in rois}
+
+    if not settings.OCR_CASCADA:
+        return textos, pasadas
+
+    invalidos = [
+        campo for campo in rois
+        if campo in VALIDADORES and not VALIDADORES[campo](textos[campo], contexto)
+    ]
+
+    for nivel in range(settings.OCR_CASCADA_MAX_PASADAS - 1):
+        perfiles = {}
+        for campo in invalidos:
+            reintentos = perfiles_reintento(campo)
+            if nivel < len(reintentos):
+                perfiles[campo] = reintentos[nivel]
+        if not perfiles:
+            break
+
+        nuevos = ocr_rois_concurrente(
+            {campo: rois[campo] for campo in perfiles}, perfiles=perfiles
+        )
+
+        invalidos = []
+        for campo, texto in nuevos.items():
+            pasadas[campo] += 1
+            if VALIDADORES[campo](texto, contexto):
+                textos[campo] = texto
+            else:
+                invalidos.append(campo)
+
+    return textos, pasadas
@@ -0,0 +1,114 @@
+import logging
+import queue
+import random
+import threading
+from collections import deque
+from pathlib import Path
+
+import cv2
+
+from core.config import settings
+from shared import metricas
+
+logger = logging.getLogger(__name__)
+
+# ==============================
+# DEBUG ROIS
+# ==============================
+# Volcado opcional de los recortes a disco. Está apagado por defecto; cuando
+# se activa (DEBUG_ROIS=true) las escrituras se hacen en un hilo aparte con
+# una cola acotada, y el directorio se poda por cantidad y tamaño. Los
+# encolados, escritos, descartados y eliminados se cuentan en /metrics.
+
+BASE_DIR = Path(__file__).resolve().parent  # .../backend/src/OCR
+
+TEMP_ROI_DIR = Path(settings.DEBUG_ROIS_DIR) if settings.DEBUG_ROIS_DIR else BASE_DIR / "temp_rois"
+
+_cola = None
+_hilo = None
+_lock = threading.Lock()
+
+
+def muestrear_pagina():
+
+    # Decide una vez por página si se vuelcan sus ROIs, así las muestras
+    # quedan completas en lugar de tener campos sueltos de cada factura.
+
+    if not settings.DEBUG_ROIS:
+        return False
+    return random.random() < settings.DEBUG_ROIS_MUESTREO
+
+
+def encolar_roi(nombre, roi):
+
+    # Nunca bloquea: si la cola está llena el recorte se descarta.
+
+    _iniciar_escritor()
+
+    try:
+        _cola.put_nowait((nombre, roi.copy()))
+        metricas.incrementar("gd_debug_rois_total", evento="encolados")
+    except queue.Full:
+        metricas.incrementar("gd_debug_rois_total", evento="descartados")
+
+
+# ==============================
+# ESCRITOR EN SEGUNDO PLANO
+# ==============================
+
+def _iniciar_escritor():
+    global _cola, _hilo
+
+    if _hilo is not None:
+        return
+
+    with _lock:
+        if _hilo is None:
+            TEMP_ROI_DIR.mkdir(parents=True, exist_ok=True)
+            _cola = queue.Queue(maxsize=settings.DEBUG_ROIS_COLA)
+            _hilo = threading.Thread(target=_escribir_rois, name="debug-rois", daemon=True)
+            _hilo.start()
+
+
+def _escribir_rois():
+    archivos = _archivos_existentes()
+    bytes_totales = sum(tam for _, tam in archivos)
+
+    while True:
+        nombre, roi = _cola.get()
+        ruta = TEMP_ROI_DIR / nombre
+
+        try:
+            if cv2.imwrite(str(ruta), roi):
+                tam = ruta.stat().st_size
+                archivos.append((ruta, tam))
+                bytes_totales += tam
+                metricas.incrementar("gd_debug_rois_total", evento="escritos")
+        except Exception as e:
+            logger.warning("No se pudo guardar el ROI %s: %s", nombre, e)
+        finally:
+            _cola.task_done()
+
+        bytes_totales = _aplicar_retencion(archivos, bytes_totales)
+
+
+def _archivos_existentes():
+    rutas = sorted(TEMP_ROI_DIR.glob("*.png"), key=lambda p: p.stat().st_mtime)
+    return deque((ruta, ruta.stat().st_size) for ruta in rutas)
+
+
+def _aplicar_retencion(archivos, bytes_totales):
+
+    # Borra los recortes más viejos hasta cumplir los límites configurados.
+
+    max_bytes = settings.DEBUG_ROIS_MAX_MB * 1024 * 1024
+
+    while archivos and (
+        len(archivos) > settings.DEBUG_ROIS_MAX_ARCHIVOS or bytes_totales > max_bytes
+    ):
+        ruta, tam = archivos.popleft()
+        ruta.unlink(missing_ok=True)
+        bytes_totales -= tam
+        metricas.incrementar("gd_debug_rois_total", evento="eliminados")
+
+    return bytes_totales
@@ -1,27 +1,12 @@
-import cv2
-from ultralytics import YOLO
-from pathlib import Path
-
-# ==============================
-# MODELO
-# ==============================
-
-BASE_DIR = Path(__file__).resolve().parent  # .../backend/src/OCR
+import time
+from itertools import islice
 
-MODEL_PATH = BASE_DIR.parent / "runs" / "models" / "model_yolo8n_v4_best.pt"
-
-print("Ruta del modelo probado:", MODEL_PATH)
-
-if not MODEL_PATH.exists():
-    raise FileNotFoundError(f"Modelo no encontrado en {MODEL_PATH}")
-
-model = YOLO(str(MODEL_PATH))
+import cv2
 
-# ==============================
-# DEBUG ROIS
-# ==============================
-TEMP_ROI_DIR = BASE_DIR / "temp_rois"
-TEMP_ROI_DIR.mkdir(exist_ok=True)
+from core.config import settings
+from OCR.modelo_yolo import inferir
+from OCR.debug_rois import muestrear_pagina, encolar_roi
+from OCR.cache_plantillas import consultar_plantilla, registrar_deteccion, detectar_con_plantillas
 
 # ==============================
 # CLASES
@@ -47,16 +32,75 @@ def expandir_roi(x1, y1, x2, y2, img, px=15):
     )
 
 # ==============================
-def detectar_recortar_roi_img(img, image_id):
-    results = model(img, conf=0.25)[0]
+# DETECCIÓN EN BAJA RESOLUCIÓN
+# ==============================
+# YOLO igual reduce la página a YOLO_IMGSZ; se hace una sola vez acá con
+# INTER_AREA a un tamaño rectangular (proporción A4, múltiplo del stride)
+# para que el preprocesamiento del modelo no toque la imagen completa. Las
+# cajas se vuelven a escalar y los recortes salen de la página original.
+
+STRIDE = 32
+
+def _multiplo_stride(valor):
+    return max(STRIDE, int(round(valor / STRIDE)) * STRIDE)
+
+def reducir_para_deteccion(img, lado=None):
+    lado = lado or settings.YOLO_IMGSZ
+    h, w = img.shape[:2]
+
+    if not settings.DETECCION_REDUCIDA or max(h, w) <= lado:
+        return img, (1.0, 1.0), lado
+
+    escala = lado / max(h, w)
+    nh, nw = _multiplo_stride(h * escala), _multiplo_stride(w * escala)
+    chica = cv2.resize(img, (nw, nh), interpolation=cv2.INTER_AREA)
+
+    return chica, (w / nw, h / nh), (nh, nw)
+
+def cajas_de_resultados(results, escala=(1.0, 1.0)):
+
+    # Lista de (cls_id, conf, [x1, y1, x2, y2]) en coordenadas de la página original
+
+    sx, sy = escala
+    cajas = []
+    for box in results.boxes:
+        x1, y1, x2, y2 = box.xyxy[0].tolist()
+        cajas.append((
+            int(box.cls[0]),
+            float(box.conf[0]),
+            [x1 * sx, y1 * sy, x2 * sx, y2 * sy],
+        ))
+    return cajas
+
+# ==============================
+# PÁGINA PREPROCESADA
+# ==============================
+# La conversión a grises se hace una sola vez por página y se comparte: la
+# huella de plantilla, los recortes para OCR y el volcado de debug son vistas
+# (slices) de ese buffer, sin copias ni conversiones por ROI. YOLO sigue
+# recibiendo la página color. Con OCR_BINARIZAR_PAGINA también se binariza
+# la página entera una vez y la primera pasada de OCR usa esos recortes.
+
+def preprocesar_pagina(img):
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+
+    binaria = None
+    if settings.OCR_BINARIZAR_PAGINA:
+        binaria = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+
+    return {"gray": gray, "binaria": binaria}
+
+# ==============================
+def recortar_detecciones(cajas, img, image_id, preprocesada=None):
     detecciones = {}
+    guardar_rois = muestrear_pagina()
+    preprocesada = preprocesada or preprocesar_pagina(img)
+    gray, binaria = preprocesada["gray"], preprocesada["binaria"]
 
-    for i, box in enumerate(results.boxes):
-        cls_id = int(box.cls[0])
+    for i, (cls_id, conf, xyxy) in enumerate(cajas):
         class_name = CLASSES[cls_id]
-        conf = float(box.conf[0])
 
-        x1, y1, x2, y2 = map(int, box.xyxy[0].tolist())
+        x1, y1, x2, y2 = map(int, xyxy)
 
         # Ajustes por campo
         if class_name in ["cuit_emisor", "total"]:
@@ -73,24 +117,78 @@ def detectar_recortar_roi_img(img, image_id):
         elif class_name == "tabla_items":
             y1 = min(img.shape[0], y1 + 30)  # sacar títulos
 
-        roi = img[y1:y2, x1:x2]
+        roi = gray[y1:y2, x1:x2]
         if roi.size == 0:
             continue
 
         # ==============================
-        # GUARDAR ROIs
+        # GUARDAR ROIs (solo en modo debug)
         # ==============================
-        roi_name = f"{image_id}_{class_name}_{i}_{int(conf*100)}.png"
-        cv2.imwrite(
-            str(TEMP_ROI_DIR / roi_name),
-            roi
-        )
+        if guardar_rois:
+            roi_name = f"{image_id}_{class_name}_{i}_{int(conf*100)}.png"
+            encolar_roi(roi_name, roi)
 
         detecciones[class_name] = {
             "bbox": [x1, y1, x2, y2],
             "conf": conf,
             "roi": roi
         }
+        if binaria is not None:
+            detecciones[class_name]["roi_bin"] = binaria[y1:y2, x1:x2]
 
     return detecciones
 
+# ==============================
+def detectar_cajas(img):
+    chica, escala, imgsz = reducir_para_deteccion(img)
+    results = inferir(chica, imgsz)[0]
+    return cajas_de_resultados(results, escala)
+
+def detectar_recortar_roi_img(img, image_id, preprocesada=None):
+    preprocesada = preprocesada or preprocesar_pagina(img)
+    cajas = detectar_con_plantillas(img, detectar_cajas, preprocesada["gray"])
+    return recortar_detecciones(cajas, img, image_id, preprocesada)
+
+# ==============================
+# DETECCIÓN POR LOTES
+# ==============================
+def detectar_recortar_rois_lote(paginas, batch_size=None):
+
+    # paginas: iterable de tuplas (img, image_id). Devuelve un generador
+    # con un dict de detecciones por página, en el mismo orden de entrada.
+
+    batch_size = batch_size or settings.YOLO_BATCH_SIZE
+    if batch_size < 1:
+        raise ValueError("batch_size debe ser mayor a 0")
+
+    paginas = iter(paginas)
+
+    while True:
+        lote = list(islice(paginas, batch_size))
+        if not lote:
+            return
+
+        # Las páginas con plantilla conocida no pasan por el modelo
+        preprocesadas = [preprocesar_pagina(img) for img, _ in lote]
+        consultas = [consultar_plantilla(p["gray"]) for p in preprocesadas]
+        pendientes = [i for i, (cajas, _) in enumerate(consultas) if cajas is None]
+        cajas_lote = [cajas for cajas, _ in consultas]
+
+        # Las páginas se agrupan por tamaño reducido: en un PDF con hojas
+        # verticales y apaisadas cada grupo va al modelo con su propio imgsz
+        reducidas = {i: reducir_para_deteccion(lote[i][0]) for i in pendientes}
+        grupos = {}
+        for i in pendientes:
+            grupos.setdefault(reducidas[i][2], []).append(i)
+
+        for imgsz, indices in grupos.items():
+            inicio = time.perf_counter()
+            results = inferir([reducidas[i][0] for i in indices], imgsz)
+            segundos = (time.perf_counter() - inicio) / len(indices)
+
+            for i, res in zip(indices, results):
+                cajas_lote[i] = cajas_de_resultados(res, reducidas[i][1])
+                registrar_deteccion(consultas[i][1], cajas_lote[i], segundos)
+
+        for (img, image_id), cajas, preprocesada in zip(lote, cajas_lote, preprocesadas):
+            yield recortar_detecciones(cajas, img, image_id, preprocesada)
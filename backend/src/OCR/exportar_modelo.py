@@ -0,0 +1,163 @@
+import argparse
+import shutil
+import tempfile
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from core.config import settings
+from OCR.modelo_yolo import MODEL_PATH, ruta_modelo, cargar_modelo
+from OCR.detectar_recortar_ROIs import CLASSES
+
+# ============================================================
+# EXPORTACIÓN DEL DETECTOR A ONNX / OPENVINO
+# ============================================================
+# Uso (desde backend/src):
+#   python -m OCR.exportar_modelo --formato onnx
+#   python -m OCR.exportar_modelo --formato onnx --int8
+#   python -m OCR.exportar_modelo --formato openvino --int8
+#
+# La cuantización int8 se calibra con las facturas sintéticas de dataset/
+# (generadas con dataset/generar_facturas.py). Los archivos quedan junto al
+# .pt con los nombres que espera modelo_yolo.ruta_modelo().
+
+DATASET_DIR = Path(__file__).resolve().parents[3] / "dataset" / "facturas_prueba_png"
+
+
+def imagenes_calibracion(carpeta, limite):
+    rutas = sorted(carpeta.glob("*.png"))[:limite]
+    if not rutas:
+        raise SystemExit(f"No hay imágenes de calibración en {carpeta}")
+    return rutas
+
+
+def letterbox(img, imgsz):
+
+    # Mismo preprocesamiento que aplica ultralytics antes de la red:
+    # reescalado manteniendo proporción, padding gris, RGB, CHW, [0, 1]
+
+    h, w = img.shape[:2]
+    r = min(imgsz / h, imgsz / w)
+    nh, nw = round(h * r), round(w * r)
+    img = cv2.resize(img, (nw, nh), interpolation=cv2.INTER_LINEAR)
+
+    lienzo = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    top, left = (imgsz - nh) // 2, (imgsz - nw) // 2
+    lienzo[top:top + nh, left:left + nw] = img
+
+    x = lienzo[:, :, ::-1].transpose(2, 0, 1)
+    return np.ascontiguousarray(x, dtype=np.float32)[None] / 255.0
+
+
+# ==============================
+# ONNX
+# ==============================
+
+def exportar_onnx(imgsz, int8, calibracion):
+    model = cargar_modelo(MODEL_PATH)
+    exportado = Path(model.export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True))
+
+    destino_fp32 = ruta_modelo("onnx", int8=False)
+    if exportado != destino_fp32:
+        shutil.move(str(exportado), destino_fp32)
+
+    if not int8:
+        return destino_fp32
+
+    from onnxruntime.quantization import (
+        CalibrationDataReader, QuantFormat, QuantType, quantize_static
+    )
+
+    class LectorFacturas(CalibrationDataReader):
+        def __init__(self, rutas, nombre_entrada):
+            self.rutas = iter(rutas)
+            self.nombre_entrada = nombre_entrada
+
+        def get_next(self):
+            ruta = next(self.rutas, None)
+            if ruta is None:
+                return None
+            return {self.nombre_entrada: letterbox(cv2.imread(str(ruta)), imgsz)}
+
+    import onnx
+    nombre_entrada = onnx.load(str(destino_fp32)).graph.input[0].name
+
+    destino = ruta_modelo("onnx", int8=True)
+    quantize_static(
+        str(destino_fp32),
+        str(destino),
+        LectorFacturas(calibracion, nombre_entrada),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+    )
+    return destino
+
+
+# ==============================
+# OPENVINO
+# ==============================
+
+def _yaml_calibracion(calibracion, directorio):
+
+    # ultralytics calibra int8 (NNCF) a partir de un dataset YAML; las
+    # imágenes de calibración no necesitan etiquetas.
+
+    imagenes = directorio / "images" / "val"
+    imagenes.mkdir(parents=True)
+    for ruta in calibracion:
+        shutil.copy(ruta, imagenes / ruta.name)
+
+    yaml_path = directorio / "calibracion.yaml"
+    yaml_path.write_text(
+        f"path: {directorio}\ntrain: images/val\nval: images/val\n"
+        f"nc: {len(CLASSES)}\nnames: {CLASSES}\n",
+        encoding="utf-8",
+    )
+    return yaml_path
+
+
+def exportar_openvino(imgsz, int8, calibracion):
+    model = cargar_modelo(MODEL_PATH)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        kwargs = {"format": "openvino", "imgsz": imgsz, "dynamic": True}
+        if int8:
+            kwargs.update(int8=True, data=str(_yaml_calibracion(calibracion, Path(tmp))))
+        exportado = Path(model.export(**kwargs))
+
+    destino = ruta_modelo("openvino", int8=int8)
+    if exportado != destino:
+        shutil.rmtree(destino, ignore_errors=True)
+        shutil.move(str(exportado), destino)
+    return destino
+
+
+# ==============================
+# MAIN
+# ==============================
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta el detector YOLO a ONNX u OpenVINO")
+    parser.add_argument("--formato", choices=["onnx", "openvino"], required=True)
+    parser.add_argument("--int8", action="store_true", help="cuantizar a int8 calibrando con dataset/")
+    parser.add_argument("--imgsz", type=int, default=settings.YOLO_IMGSZ)
+    parser.add_argument("--calibracion", type=Path, default=DATASET_DIR)
+    parser.add_argument("--max-calibracion", type=int, default=100)
+    args = parser.parse_args()
+
+    calibracion = imagenes_calibracion(args.calibracion, args.max_calibracion) if args.int8 else []
+
+    if args.formato == "onnx":
+        destino = exportar_onnx(args.imgsz, args.int8, calibracion)
+    else:
+        destino = exportar_openvino(args.imgsz, args.int8, calibracion)
+
+    print(f"Modelo exportado en: {destino}")
+    print(f"Usar con DETECTOR_BACKEND={args.formato} DETECTOR_INT8={str(args.int8).lower()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,41 @@
-from OCR.pipeline_detectar_yolo_ocr import procesar_factura_img
+from OCR.pipeline_detectar_yolo_ocr import procesar_factura_img, procesar_facturas_lote
 from OCR.normalizar_ocr import NORMALIZADORES, normalizar_tabla_items
+from shared import metricas
 
+# Subir cuando cambie cualquier etapa del pipeline que altere los resultados
+# (invalida la caché de resultados). Los ajustes que cambian resultados
+# (resolución de detección, cascada, binarización) van aparte, en la clave
+# de services/cache_resultados.py
+VERSION_PIPELINE = "4"
 
-def extraer_factura_backend(img, image_id: str | None = None):
 
-    resultado_raw = procesar_factura_img(img, image_id)
+def extraer_factura_backend(img, image_id: str | None = None, detecciones=None, preprocesada=None):
+
+    # preprocesada: salida de preprocesar_pagina(img), si ya se calculó
+    with metricas.medir("gd_etapa_segundos", etapa="extraccion"):
+        resultado_raw = procesar_factura_img(img, image_id, detecciones, preprocesada)
+        return armar_salida(resultado_raw)
+
+
+def extraer_facturas_backend_lote(paginas, batch_size: int | None = None):
+
+    # paginas: iterable de tuplas (img, image_id)
+    for resultado_raw in procesar_facturas_lote(paginas, batch_size):
+        yield armar_salida(resultado_raw)
+
+
+@metricas.medido("gd_etapa_segundos", etapa="normalizacion")
+def armar_salida(resultado_raw):
 
     salida = {}
 
     # Normalizar todos los campos
     for campo, datos in resultado_raw.items():
         texto_ocr = datos.get("texto_ocr", "") or ""
-        if campo in NORMALIZADORES:
+        if "items" in datos:
+            # tabla_items leída por celdas: ya viene separada
+            salida[campo] = datos["items"]
+        elif campo in NORMALIZADORES:
             salida[campo] = NORMALIZADORES[campo](texto_ocr)
         else:
             salida[campo] = texto_ocr.strip()
@@ -32,4 +56,6 @@ def extraer_factura_backend(img, image_id: str | None = None):
         "fecha": salida.get("fecha", ""),
         "tabla_items": tabla_items,
         "total": salida.get("total", 0.0),
+        # Lecturas de OCR por campo (cascada de reintentos)
+        "pasadas_ocr": {campo: datos.get("pasadas", 1) for campo, datos in resultado_raw.items()},
     }
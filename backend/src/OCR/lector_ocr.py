@@ -1,21 +1,75 @@
+import logging
+import time
+
 import pytesseract
 import cv2
 
+from OCR import motor_tesseract
+from OCR.perfiles_ocr import PERFIL_DEFAULT, config_tesseract
+from shared import metricas
+
+logger = logging.getLogger(__name__)
+
 def limpiar_texto(txt):
     if not txt:
         return ""
     return " ".join(txt.replace("\n", " ").split())
 
-def ocr_roi(img):
+def preprocesar_roi(img, perfil):
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+
+    if perfil["escala"] != 1.0:
+        gray = cv2.resize(
+            gray, None,
+            fx=perfil["escala"], fy=perfil["escala"],
+            interpolation=cv2.INTER_CUBIC
+        )
+
+    if perfil["binarizacion"] == "otsu":
+        return cv2.threshold(
+            gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU
+        )[1]
+
+    if perfil["binarizacion"] == "adaptativa":
+        return cv2.adaptiveThreshold(
+            gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 15
+        )
+
+    return gray
+
+def ocr_roi(img, perfil=None, campo=None):
+
+    # campo solo se usa para etiquetar las métricas
+
+    inicio = time.perf_counter()
+    texto = _ocr_roi(img, perfil)
+
+    campo = campo or "otro"
+    metricas.observar("gd_ocr_campo_segundos", time.perf_counter() - inicio, campo=campo)
+    if not texto:
+        metricas.incrementar("gd_ocr_vacios_total", campo=campo)
+
+    return texto
+
+def _ocr_roi(img, perfil=None):
     if img is None:
         return "UNREADABLE"
 
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    thresh = cv2.threshold(
-        gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU
-    )[1]
+    perfil = perfil or PERFIL_DEFAULT
+    thresh = preprocesar_roi(img, perfil)
+
+    # Motor persistente en proceso (tesserocr) si está disponible
+    if motor_tesseract.motor_disponible():
+        try:
+            texto = motor_tesseract.reconocer(
+                thresh, psm=perfil["psm"], whitelist=perfil["whitelist"]
+            )
+            texto = limpiar_texto(texto)
+            return texto if texto else ""
+        except Exception as e:
+            logger.warning("Falló el motor tesserocr, se usa pytesseract: %s", e)
 
-    config = "--oem 3 --psm 6 -l eng"
+    config = config_tesseract(perfil)
 
     try:
         texto = pytesseract.image_to_string(thresh, config=config)
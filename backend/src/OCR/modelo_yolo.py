@@ -0,0 +1,209 @@
+import logging
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# ==============================
+# MODELO
+# ==============================
+
+BASE_DIR = Path(__file__).resolve().parent  # .../backend/src/OCR
+
+MODELS_DIR = BASE_DIR.parent / "runs" / "models"
+
+MODEL_PATH = MODELS_DIR / "model_yolo8n_v4_best.pt"
+
+BACKENDS = ("pytorch", "onnx", "openvino")
+
+# Página A4 en blanco a 300 DPI, usada para el warm-up
+TAMANIO_PAGINA_WARMUP = (3508, 2480, 3)
+
+_model = None
+_lock = threading.Lock()
+
+# El predictor de ultralytics guarda estado por llamada y no es seguro entre
+# hilos: en modo hilos las inferencias sobre el modelo compartido se
+# serializan (el OCR de cada factura sigue corriendo en paralelo)
+_lock_inferencia = threading.Lock()
+
+# Huella por ruta de pesos: se calcula una vez (al cargar el modelo o en la
+# primera consulta) y no en cada request
+_huellas = {}
+
+_estado = {
+    "cargado": False,
+    "listo": False,
+    "error": None,
+    "tiempo_carga_s": None,
+    "tiempo_warmup_s": None,
+}
+
+
+# ==============================
+def ruta_modelo(backend=None, int8=None):
+
+    # Ruta de los pesos para cada backend de inferencia. Los formatos
+    # exportados se generan con OCR/exportar_modelo.py junto al .pt
+
+    backend = backend or settings.DETECTOR_BACKEND
+    int8 = settings.DETECTOR_INT8 if int8 is None else int8
+    sufijo = "_int8" if int8 else ""
+
+    if backend == "pytorch":
+        return MODEL_PATH
+    if backend == "onnx":
+        return MODELS_DIR / f"{MODEL_PATH.stem}{sufijo}.onnx"
+    if backend == "openvino":
+        return MODELS_DIR / f"{MODEL_PATH.stem}{sufijo}_openvino_model"
+
+    raise ValueError(f"Backend de detección desconocido: {backend} (opciones: {', '.join(BACKENDS)})")
+
+
+def cargar_modelo(ruta):
+    from ultralytics import YOLO
+
+    # Los formatos exportados no guardan la tarea: hay que indicarla
+    return YOLO(str(ruta), task="detect")
+
+
+# ==============================
+def get_model():
+
+    # Devuelve la instancia única del modelo, cargándola en el primer uso.
+    # ultralytics/torch se importan recién acá para no pagarlo al importar la API.
+
+    global _model
+
+    if _model is not None:
+        return _model
+
+    with _lock:
+        if _model is None:
+            ruta = ruta_modelo()
+            if not ruta.exists():
+                _estado["error"] = f"Modelo no encontrado en {ruta}"
+                raise FileNotFoundError(_estado["error"])
+
+            inicio = time.perf_counter()
+            _model = cargar_modelo(ruta)
+            _estado["tiempo_carga_s"] = round(time.perf_counter() - inicio, 3)
+            _estado["cargado"] = True
+            _huellas[ruta] = _calcular_huella(ruta)
+            logger.info(
+                "Modelo YOLO (%s) cargado desde %s en %.3fs",
+                settings.DETECTOR_BACKEND, ruta, _estado["tiempo_carga_s"]
+            )
+
+    return _model
+
+
+def inferir(imagenes, imgsz):
+
+    # Única entrada a la inferencia YOLO: detección, lotes y warm-up
+
+    model = get_model()
+    with _lock_inferencia:
+        return model(imagenes, conf=settings.YOLO_CONF, imgsz=imgsz, verbose=False)
+
+
+def warmup_model():
+
+    # Corre una inferencia sobre una página en blanco para que la primera
+    # factura real no pague la inicialización perezosa del modelo. La página
+    # pasa por reducir_para_deteccion como las reales, así los backends con
+    # formas dinámicas (ONNX, OpenVINO) compilan el mismo tamaño de entrada.
+    #
+    # Con YOLO_WARMUP_AL_INICIAR apagado el modelo se carga con la primera
+    # factura: alcanza con que los pesos existan para darlo por listo.
+
+    from OCR.detectar_recortar_ROIs import reducir_para_deteccion  # import circular
+
+    if _estado["listo"]:
+        return
+
+    if not settings.YOLO_WARMUP_AL_INICIAR:
+        ruta = ruta_modelo()
+        if not ruta.exists():
+            _estado["error"] = f"Modelo no encontrado en {ruta}"
+            raise FileNotFoundError(_estado["error"])
+        _estado["listo"] = True
+        _estado["error"] = None
+        return
+
+    try:
+        get_model()
+        inicio = time.perf_counter()
+        dummy = np.full(TAMANIO_PAGINA_WARMUP, 255, dtype=np.uint8)
+        chica, _, imgsz = reducir_para_deteccion(dummy)
+        inferir(chica, imgsz)
+        _estado["tiempo_warmup_s"] = round(time.perf_counter() - inicio, 3)
+        _estado["listo"] = True
+        _estado["error"] = None
+        logger.info("Warm-up del modelo YOLO en %.3fs", _estado["tiempo_warmup_s"])
+    except Exception as e:
+        _estado["error"] = str(e)
+        logger.error("Falló el warm-up del modelo YOLO: %s", e)
+        raise
+
+
+def warmup_model_en_segundo_plano():
+    hilo = threading.Thread(target=_warmup_silencioso, name="yolo-warmup", daemon=True)
+    hilo.start()
+    return hilo
+
+
+def _warmup_silencioso():
+    try:
+        warmup_model()
+    except Exception:
+        pass
+
+
+def huella_modelo():
+
+    # Identifica los pesos en uso (ruta, tamaño y fecha de modificación).
+    # Si se cambia de backend cambia la huella; si se reemplazan los pesos,
+    # al reiniciar (el modelo cargado tampoco cambia hasta entonces).
+
+    ruta = ruta_modelo()
+    huella = _huellas.get(ruta)
+    if huella is None:
+        huella = _calcular_huella(ruta)
+        # Los pesos ausentes pueden aparecer después: no se memoriza
+        if not huella.endswith(":ausente"):
+            _huellas[ruta] = huella
+    return huella
+
+
+def _calcular_huella(ruta):
+    archivos = [p for p in ruta.rglob("*") if p.is_file()] if ruta.is_dir() else [ruta]
+
+    try:
+        stats = [p.stat() for p in archivos]
+    except OSError:
+        return f"{ruta.name}:ausente"
+    if not stats:
+        return f"{ruta.name}:ausente"
+
+    tamanio = sum(st.st_size for st in stats)
+    mtime = max(int(st.st_mtime) for st in stats)
+    return f"{ruta.name}:{tamanio}:{mtime}"
+
+
+def modelo_listo():
+    return _estado["listo"]
+
+
+def estado_modelo():
+    return dict(
+        _estado,
+        modelo=str(ruta_modelo()),
+        backend=settings.DETECTOR_BACKEND,
+        int8=settings.DETECTOR_INT8,
+    )
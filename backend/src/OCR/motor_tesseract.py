@@ -0,0 +1,123 @@
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# ==============================
+# MOTORES TESSERACT EN PROCESO
+# ==============================
+# Pool de instancias de la API C de Tesseract (vía tesserocr). Cada motor se
+# inicializa una sola vez con el traineddata cargado y recibe el buffer numpy
+# directamente, sin archivos temporales ni subprocesos. Si tesserocr no está
+# instalado, lector_ocr sigue usando pytesseract.
+
+try:
+    import tesserocr
+except ImportError:  # dependencia opcional
+    tesserocr = None
+
+IDIOMA = "eng"
+DPI_PAGINA = 300
+
+_motores = None
+_creados = 0
+_lock = threading.Lock()
+
+
+def motor_disponible():
+    if settings.OCR_MOTOR == "pytesseract":
+        return False
+    if tesserocr is None:
+        if settings.OCR_MOTOR == "tesserocr":
+            logger.warning("OCR_MOTOR=tesserocr pero tesserocr no está instalado; se usa pytesseract")
+        return False
+    return True
+
+
+def _tamanio_pool():
+    return settings.OCR_MOTORES or settings.OCR_WORKERS
+
+
+def _crear_motor():
+    return tesserocr.PyTessBaseAPI(
+        lang=IDIOMA,
+        oem=tesserocr.OEM.DEFAULT,
+        psm=tesserocr.PSM.SINGLE_BLOCK
+    )
+
+
+@contextmanager
+def obtener_motor():
+
+    # Presta un motor del pool; se crean a demanda hasta el tamaño máximo
+    # y después los hilos esperan a que se libere uno. El lugar se reserva
+    # bajo el lock pero el motor (carga del traineddata) se crea afuera,
+    # para no frenar a los demás hilos.
+
+    global _motores, _creados
+
+    with _lock:
+        if _motores is None:
+            _motores = queue.LifoQueue()
+        motores = _motores
+        motor = None
+        crear = False
+        try:
+            motor = motores.get_nowait()
+        except queue.Empty:
+            if _creados < _tamanio_pool():
+                _creados += 1
+                crear = True
+
+    if crear:
+        try:
+            motor = _crear_motor()
+        except Exception:
+            with _lock:
+                _creados -= 1
+            raise
+    elif motor is None:
+        motor = motores.get()
+
+    try:
+        yield motor
+    finally:
+        motor.Clear()
+        motores.put(motor)
+
+
+def reconocer(img, psm=6, whitelist=""):
+
+    # img: ndarray uint8 de un canal (escala de grises o binarizada)
+
+    if img.ndim != 2:
+        raise ValueError("El motor espera una imagen de un canal")
+
+    h, w = img.shape
+    buf = img if img.flags["C_CONTIGUOUS"] else img.copy()
+
+    with obtener_motor() as motor:
+        motor.SetPageSegMode(psm)
+        motor.SetVariable("tessedit_char_whitelist", whitelist)
+        motor.SetImageBytes(buf.tobytes(), w, h, 1, w)
+        motor.SetSourceResolution(DPI_PAGINA)
+        return motor.GetUTF8Text()
+
+
+def cerrar_motores():
+    global _motores, _creados
+
+    with _lock:
+        if _motores is None:
+            return
+        while True:
+            try:
+                _motores.get_nowait().End()
+            except queue.Empty:
+                break
+        _motores = None
+        _creados = 0
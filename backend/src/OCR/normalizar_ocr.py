@@ -1,7 +1,12 @@
+import argparse
 import csv
 import os
 import re
 import datetime
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 
 # ============================================================
 # 1) FUNCIONES DE NORMALIZACIÓN
@@ -191,6 +196,94 @@ NORMALIZADORES = {
 # ============================================================
 # 3) PROCESAMIENTO DEL CSV DE VALIDACIÓN
 # ============================================================
+# Se lee en streaming: las filas se agrupan en bloques que se normalizan en
+# un pool de procesos, con a lo sumo 2 bloques por worker en vuelo, y se
+# escriben en el orden original apenas están listas. La memoria no depende
+# del tamaño del archivo.
+#
+# Uso (desde backend/src):
+#   python -m OCR.normalizar_ocr entrada.csv salida.csv --workers 4
+
+COLUMNAS_SALIDA = [
+    "factura", "campo",
+    "texto_ocr", "texto_ocr_normalizado",
+    "texto_esperado", "correcto"
+]
+
+
+def normalizar_fila(row, indices):
+
+    # row: lista de valores del CSV; indices: columna -> posición
+
+    campo = row[indices["campo"]]
+    texto_ocr = row[indices["texto_ocr"]]
+
+    if campo in NORMALIZADORES:
+        texto_norm = NORMALIZADORES[campo](texto_ocr)
+    else:
+        texto_norm = texto_ocr.strip()
+
+    return [
+        row[indices["factura"]],
+        campo,
+        texto_ocr,
+        texto_norm,
+        row[indices["texto_esperado"]],
+        row[indices["correcto"]]
+    ]
+
+
+def normalizar_bloque(filas, indices):
+    return [normalizar_fila(row, indices) for row in filas]
+
+
+def normalizar_csv_streaming(ruta_in, ruta_out, tam_bloque=5000, workers=None):
+
+    # Devuelve (filas, segundos). Las filas viajan a los workers como listas
+    # (no dicts) para abaratar la serialización.
+
+    workers = workers or os.cpu_count() or 1
+    inicio = time.perf_counter()
+    total = 0
+
+    with open(ruta_in, "r", encoding="utf-8", newline="") as f_in, \
+            open(ruta_out, "w", newline="", encoding="utf-8") as f_out:
+        reader = csv.reader(f_in)
+        encabezado = next(reader, [])
+        indices = {columna: encabezado.index(columna) for columna in COLUMNAS_SALIDA if columna in encabezado}
+
+        faltantes = set(COLUMNAS_SALIDA) - set(indices) - {"texto_ocr_normalizado"}
+        if faltantes:
+            raise ValueError(f"Faltan columnas en {ruta_in}: {', '.join(sorted(faltantes))}")
+
+        writer = csv.writer(f_out)
+        writer.writerow(COLUMNAS_SALIDA)
+
+        if workers <= 1:
+            for row in reader:
+                writer.writerow(normalizar_fila(row, indices))
+                total += 1
+            return total, time.perf_counter() - inicio
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            en_vuelo = deque()
+
+            while True:
+                bloque = list(islice(reader, tam_bloque))
+                if bloque:
+                    en_vuelo.append(pool.submit(normalizar_bloque, bloque, indices))
+
+                # Se escribe en orden; si no hay más entrada se vacía la cola
+                while en_vuelo and (len(en_vuelo) >= 2 * workers or not bloque):
+                    filas = en_vuelo.popleft().result()
+                    writer.writerows(filas)
+                    total += len(filas)
+
+                if not bloque:
+                    break
+
+    return total, time.perf_counter() - inicio
+
 
 def normalizar_csv_validacion(
         entrada="validacion_ocr.csv",
@@ -204,40 +297,7 @@ def normalizar_csv_validacion(
         print(f"No se encontró {ruta_in}")
         return
 
-    filas_normalizadas = []
-
-    with open(ruta_in, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-
-        for row in reader:
-            campo = row["campo"]
-            texto_ocr = row.get("texto_ocr", "")
-
-            if campo in NORMALIZADORES:
-                texto_norm = NORMALIZADORES[campo](texto_ocr)
-            else:
-                texto_norm = texto_ocr.strip()
-
-            row["texto_ocr_normalizado"] = texto_norm
-            filas_normalizadas.append(row)
-
-    with open(ruta_out, "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow([
-            "factura", "campo",
-            "texto_ocr", "texto_ocr_normalizado",
-            "texto_esperado", "correcto"
-        ])
-
-        for r in filas_normalizadas:
-            writer.writerow([
-                r["factura"],
-                r["campo"],
-                r["texto_ocr"],
-                r["texto_ocr_normalizado"],
-                r["texto_esperado"],
-                r["correcto"]
-            ])
+    normalizar_csv_streaming(ruta_in, ruta_out)
 
     print(f"Archivo normalizado generado: {ruta_out}")
 
@@ -246,6 +306,25 @@ def normalizar_csv_validacion(
 # 4) MAIN
 # ============================================================
 
+def main():
+    parser = argparse.ArgumentParser(description="Normaliza un CSV de validación de OCR")
+    parser.add_argument("entrada", nargs="?", default=os.path.join("./logs", "validacion_ocr.csv"))
+    parser.add_argument("salida", nargs="?", default=os.path.join("./logs", "validacion_ocr_normalizado.csv"))
+    parser.add_argument("--tam-bloque", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.entrada):
+        raise SystemExit(f"No se encontró {args.entrada}")
+
+    filas, segundos = normalizar_csv_streaming(
+        args.entrada, args.salida, args.tam_bloque, args.workers
+    )
+
+    print(f"Archivo normalizado generado: {args.salida}")
+    print(f"{filas} filas en {segundos:.2f} s ({filas / segundos if segundos else 0:.0f} filas/s)")
+
+
 if __name__ == "__main__":
-    normalizar_csv_validacion()
+    main()
     print("✔ Normalización completada.")
@@ -0,0 +1,82 @@
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from core.config import settings
+from OCR.lector_ocr import ocr_roi
+from OCR.perfiles_ocr import perfil_para
+
+# ==============================
+# POOL DE OCR
+# ==============================
+# Tesseract libera el GIL mientras reconoce, así que un pool de hilos alcanza
+# para solapar los campos de una factura. El pool es compartido por todo el
+# proceso (OCR_WORKERS) y cada request usa como mucho
+# OCR_MAX_CONCURRENCIA_POR_REQUEST hilos a la vez.
+
+_pool = None
+_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(
+                    max_workers=settings.OCR_WORKERS,
+                    thread_name_prefix="ocr"
+                )
+    return _pool
+
+
+def etiqueta_campo(campo):
+    # "tabla_items.3.cantidad" -> "tabla_items.cantidad" (cardinalidad acotada)
+    return re.sub(r"\.\d+\.", ".", campo)
+
+
+def ocr_rois_concurrente(rois, max_concurrencia=None, perfiles=None):
+
+    # rois: dict campo -> imagen. Devuelve dict campo -> texto OCR,
+    # con las mismas claves y en el mismo orden. Cada campo se lee con
+    # su perfil de PERFILES_OCR, salvo que perfiles (dict campo -> perfil)
+    # indique otro.
+
+    if not rois:
+        return {}
+
+    max_concurrencia = max_concurrencia or settings.OCR_MAX_CONCURRENCIA_POR_REQUEST
+    perfiles = perfiles or {}
+
+    def perfil(campo):
+        return perfiles.get(campo) or perfil_para(campo)
+
+    if max_concurrencia <= 1 or len(rois) == 1:
+        return {
+            campo: ocr_roi(roi, perfil(campo), etiqueta_campo(campo))
+            for campo, roi in rois.items()
+        }
+
+    pool = get_pool()
+    pendientes = iter(rois.items())
+    en_curso = {}
+    textos = {}
+
+    def enviar_siguiente():
+        siguiente = next(pendientes, None)
+        if siguiente is not None:
+            campo, roi = siguiente
+            en_curso[pool.submit(ocr_roi, roi, perfil(campo), etiqueta_campo(campo))] = campo
+
+    for _ in range(min(max_concurrencia, len(rois))):
+        enviar_siguiente()
+
+    while en_curso:
+        terminados, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+        for futuro in terminados:
+            campo = en_curso.pop(futuro)
+            textos[campo] = futuro.result()
+            enviar_siguiente()
+
+    return {campo: textos[campo] for campo in rois}
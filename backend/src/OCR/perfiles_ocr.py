@@ -0,0 +1,115 @@
+# ============================================================
+# PERFILES DE OCR POR CAMPO
+# ============================================================
+# Cada clase de CLASSES tiene su propia configuración de Tesseract:
+#   psm          -> modo de segmentación de página
+#   whitelist    -> caracteres permitidos ("" = sin restricción). Incluye
+#                   las letras de la etiqueta impresa ("CUIT:", "Fecha de
+#                   Emisión:", ...) para que no se confundan con dígitos.
+#   escala       -> factor de reescalado del recorte antes del OCR
+#   binarizacion -> "otsu", "adaptativa" o None (escala de grises)
+#
+# Los campos de una línea con dígitos (cuit, fecha, número, total) no
+# necesitan el análisis de bloque completo de psm 6.
+
+PERFIL_DEFAULT = {
+    "psm": 6,
+    "whitelist": "",
+    "escala": 1.0,
+    "binarizacion": "otsu",
+}
+
+PERFILES_OCR = {
+    "tipo_factura": {
+        # letra grande + "COD. 0xx" en dos líneas
+        "psm": 6,
+        "whitelist": "",
+        "escala": 1.0,
+        "binarizacion": "otsu",
+    },
+    "razon_social": {
+        "psm": 7,
+        "whitelist": "",
+        "escala": 1.0,
+        "binarizacion": "otsu",
+    },
+    "cuit_emisor": {
+        "psm": 7,
+        "whitelist": "CUIT:0123456789-",
+        "escala": 1.0,
+        "binarizacion": "otsu",
+    },
+    "numero_factura": {
+        "psm": 7,
+        "whitelist": "PuntodeVntaCmp.Nr0123456789",
+        "escala": 1.0,
+        "binarizacion": "otsu",
+    },
+    "fecha": {
+        "psm": 7,
+        "whitelist": "FechadEmisón:0123456789/",
+        "escala": 1.0,
+        "binarizacion": "otsu",
+    },
+    "tabla_items": PERFIL_DEFAULT,
+    # Celdas de tabla_items (ver OCR/tabla_items.py)
+    "tabla_items.descripcion": {
+        "psm": 7,
+        "whitelist": "",
+        "escala": 1.0,
+        "binarizacion": "otsu",
+    },
+    "tabla_items.cantidad": {
+        # uno o dos dígitos: el recorte es chico, se agranda
+        "psm": 8,
+        "whitelist": "0123456789",
+        "escala": 2.0,
+        "binarizacion": "otsu",
+    },
+    "tabla_items.subtotal": {
+        "psm": 7,
+        "whitelist": "$0123456789.,",
+        "escala": 1.0,
+        "binarizacion": "otsu",
+    },
+    "tabla_items.fila": {
+        "psm": 7,
+        "whitelist": "",
+        "escala": 1.0,
+        "binarizacion": "otsu",
+    },
+    "total": {
+        "psm": 7,
+        "whitelist": "ImporteTtal:$0123456789.,",
+        "escala": 1.0,
+        "binarizacion": "otsu",
+    },
+}
+
+
+def perfil_para(campo):
+    return PERFILES_OCR.get(campo, PERFIL_DEFAULT)
+
+
+def perfiles_reintento(campo):
+
+    # Perfiles más caros para la cascada (OCR/cascada_ocr.py), en el orden
+    # en que se prueban cuando la lectura rápida no valida
+
+    base = perfil_para(campo)
+    escala = base["escala"] * 2
+    return [
+        {**base, "escala": escala},
+        {**base, "escala": escala, "binarizacion": "adaptativa"},
+        {**base, "escala": escala, "psm": 6 if base["psm"] != 6 else 11},
+    ]
+
+
+def config_tesseract(perfil):
+
+    # Arma la línea de configuración equivalente para pytesseract
+
+    config = f"--oem 3 --psm {perfil['psm']} -l eng"
+    if perfil["whitelist"]:
+        config += f" -c tessedit_char_whitelist={perfil['whitelist']}"
+    return config
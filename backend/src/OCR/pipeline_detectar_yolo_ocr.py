@@ -1,6 +1,14 @@
 import re
-from OCR.detectar_recortar_ROIs import detectar_recortar_roi_img
-from OCR.lector_ocr import ocr_roi
+import time
+from itertools import islice
+
+from core.config import settings
+from OCR.detectar_recortar_ROIs import detectar_recortar_roi_img, detectar_recortar_rois_lote
+from OCR.ocr_concurrente import ocr_rois_concurrente
+from OCR.perfiles_ocr import perfil_para
+from OCR.tabla_items import segmentar_tabla, armar_items, texto_tabla
+from OCR.cascada_ocr import reintentar_invalidos
+from shared import metricas
 
 def extraer_tipo_factura(texto):
     texto = texto.upper()
@@ -13,13 +21,65 @@ def extraer_total(texto):
     m = re.search(r"(\d{1,3}(\.\d{3})*,\d{2})", texto)
     return m.group(1) if m else ""
 
-def procesar_factura_img(img, image_id):
+def procesar_factura_img(img, image_id, detecciones=None, preprocesada=None):
 
-    detecciones = detectar_recortar_roi_img(img, image_id)
+    # detecciones puede venir precalculado (p. ej. desde detectar_recortar_rois_lote)
+    if detecciones is None:
+        with metricas.medir("gd_etapa_segundos", etapa="deteccion"):
+            detecciones = detectar_recortar_roi_img(img, image_id, preprocesada)
     resultado = {}
 
+    for campo in detecciones:
+        metricas.incrementar("gd_detecciones_total", clase=campo)
+
+    rois = {campo: info["roi"] for campo, info in detecciones.items()}
+    perfiles = {}
+
+    # Con la página ya binarizada, los campos con Otsu simple leen ese
+    # recorte directamente (los reintentos usan el recorte en grises)
     for campo, info in detecciones.items():
-        texto = ocr_roi(info["roi"])
+        perfil = perfil_para(campo)
+        if "roi_bin" in info and perfil["binarizacion"] == "otsu" and perfil["escala"] == 1.0:
+            rois[campo] = info["roi_bin"]
+            perfiles[campo] = {**perfil, "binarizacion": None}
+
+    # La tabla se lee por celdas: se reemplaza el bloque por las filas con
+    # texto, salvo que no se encuentre ninguna
+    filas = []
+    if "tabla_items" in rois:
+        with metricas.medir("gd_etapa_segundos", etapa="segmentacion_tabla"):
+            filas = segmentar_tabla(detecciones["tabla_items"]["roi"])
+        if filas:
+            del rois["tabla_items"]
+        for i, celdas in enumerate(filas):
+            for columna, celda in celdas.items():
+                rois[f"tabla_items.{i}.{columna}"] = celda
+                perfiles[f"tabla_items.{i}.{columna}"] = perfil_para(f"tabla_items.{columna}")
+
+    # Los campos y las celdas son independientes: se leen en paralelo
+    inicio_ocr = time.perf_counter()
+    textos = ocr_rois_concurrente(rois, perfiles=perfiles)
+
+    items = None
+    if filas:
+        textos_filas = [
+            {columna: textos[f"tabla_items.{i}.{columna}"] for columna in celdas}
+            for i, celdas in enumerate(filas)
+        ]
+        textos["tabla_items"] = texto_tabla(textos_filas)
+        items = armar_items(textos_filas)
+
+    # Los campos que no validan se releen con perfiles más caros
+    textos, pasadas = reintentar_invalidos(
+        {campo: info["roi"] for campo, info in detecciones.items()}, textos, {"items": items}
+    )
+    metricas.observar("gd_etapa_segundos", time.perf_counter() - inicio_ocr, etapa="ocr")
+
+    for campo, n in pasadas.items():
+        metricas.incrementar("gd_ocr_pasadas_total", n, campo=campo)
+
+    for campo, info in detecciones.items():
+        texto = textos[campo]
 
         if campo == "tipo_factura":
             texto = extraer_tipo_factura(texto)
@@ -33,7 +93,30 @@ def procesar_factura_img(img, image_id):
         resultado[campo] = {
             "texto_ocr": texto,
             "conf": info["conf"],
-            "bbox": info["bbox"]
+            "bbox": info["bbox"],
+            "pasadas": pasadas[campo]
         }
 
+        if campo == "tabla_items" and items is not None:
+            resultado[campo]["items"] = items
+
     return resultado
+
+
+def procesar_facturas_lote(paginas, batch_size=None):
+
+    # paginas: iterable de tuplas (img, image_id). Devuelve un generador de
+    # resultados con el mismo formato que procesar_factura_img. Solo se
+    # mantiene en memoria un lote de páginas a la vez.
+
+    batch_size = batch_size or settings.YOLO_BATCH_SIZE
+    paginas = iter(paginas)
+
+    while True:
+        lote = list(islice(paginas, batch_size))
+        if not lote:
+            return
+
+        detecciones_lote = detectar_recortar_rois_lote(lote, batch_size)
+        for (img, image_id), detecciones in zip(lote, detecciones_lote):
+            yield procesar_factura_img(img, image_id, detecciones)
@@ -0,0 +1,148 @@
+import cv2
+import numpy as np
+
+from OCR.normalizar_ocr import normalizar_total, normalizar_tabla_items
+
+# ============================================================
+# SEGMENTACIÓN DE LA TABLA DE ITEMS
+# ============================================================
+# La caja de tabla_items suele ser casi toda blanca: una a tres filas arriba
+# y espacio vacío abajo. En vez de pasarle el bloque entero a Tesseract se
+# buscan las filas con tinta (perfil de proyección horizontal, sin los
+# bordes de la tabla) y dentro de cada fila las columnas (perfil vertical).
+# Cada celda se lee por separado con su perfil, así que los items salen ya
+# separados en descripcion / cantidad / subtotal.
+#
+# Si una fila no tiene las tres columnas esperadas se lee entera (celda
+# "fila") y se separa con el regex de normalizar_tabla_items.
+
+COLUMNAS = ("descripcion", "cantidad", "subtotal")
+
+MIN_TINTA_FILA = 2      # px con tinta para que una línea cuente como texto
+MIN_ALTO_FILA = 8       # filas más bajas se descartan como ruido
+HUECO_MAX_FILA = 3      # huecos menores dentro de una fila se unen
+MARGEN = 4              # px alrededor de cada recorte (fondo blanco para Tesseract)
+HUECO_COLUMNA = 1.5     # hueco entre columnas, en múltiplos del alto de la fila
+
+
+def _mascara_texto(roi):
+
+    # Tinta en blanco sobre negro, sin las líneas de la tabla
+
+    gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY) if roi.ndim == 3 else roi
+    tinta = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1]
+
+    h, w = tinta.shape
+    horizontales = cv2.morphologyEx(
+        tinta, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (max(w // 3, 1), 1))
+    )
+    verticales = cv2.morphologyEx(
+        tinta, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (1, max(h // 2, 40)))
+    )
+    return cv2.subtract(tinta, cv2.bitwise_or(horizontales, verticales))
+
+
+def _tramos(perfil, minimo, hueco_max):
+
+    # Tramos [inicio, fin) donde perfil >= minimo, uniendo huecos cortos
+
+    activos = np.flatnonzero(perfil >= minimo)
+    if activos.size == 0:
+        return []
+
+    cortes = np.flatnonzero(np.diff(activos) > hueco_max + 1)
+    inicios = np.concatenate(([activos[0]], activos[cortes + 1]))
+    fines = np.concatenate((activos[cortes], [activos[-1]])) + 1
+    return list(zip(inicios.tolist(), fines.tolist()))
+
+
+def _recorte(roi, y1, y2, x1, x2):
+    h, w = roi.shape[:2]
+    return roi[max(0, y1 - MARGEN):min(h, y2 + MARGEN), max(0, x1 - MARGEN):min(w, x2 + MARGEN)]
+
+
+def segmentar_tabla(roi):
+
+    # Devuelve una lista de filas; cada fila es un dict columna -> recorte
+    # (vistas sobre roi, sin copias). Lista vacía si no hay texto.
+
+    mascara = _mascara_texto(roi)
+
+    filas = []
+    for y1, y2 in _tramos(np.count_nonzero(mascara, axis=1), MIN_TINTA_FILA, HUECO_MAX_FILA):
+        alto = y2 - y1
+        if alto < MIN_ALTO_FILA:
+            continue
+
+        bloques = _tramos(
+            np.count_nonzero(mascara[y1:y2], axis=0), 1, int(alto * HUECO_COLUMNA)
+        )
+        if not bloques:
+            continue
+
+        if len(bloques) < len(COLUMNAS):
+            filas.append({"fila": _recorte(roi, y1, y2, bloques[0][0], bloques[-1][1])})
+            continue
+
+        # Cantidad y subtotal están alineados a la derecha: son los dos
+        # últimos bloques; el resto es la descripción
+        filas.append({
+            "descripcion": _recorte(roi, y1, y2, bloques[0][0], bloques[-3][1]),
+            "cantidad": _recorte(roi, y1, y2, *bloques[-2]),
+            "subtotal": _recorte(roi, y1, y2, *bloques[-1]),
+        })
+
+    return filas
+
+
+# ==============================
+# ARMADO DE ITEMS
+# ==============================
+
+def _a_int(texto):
+    try:
+        return int("".join(c for c in texto if c.isdigit()))
+    except ValueError:
+        return 0
+
+
+def _a_float(texto):
+    try:
+        return float(normalizar_total(texto))
+    except ValueError:
+        return None
+
+
+def armar_items(textos_filas):
+
+    # textos_filas: lista de dicts columna -> texto OCR (mismas claves que
+    # devuelve segmentar_tabla). Las filas sin subtotal legible (p. ej. el
+    # encabezado) se descartan.
+
+    items = []
+    for textos in textos_filas:
+        if "fila" in textos:
+            items.extend(normalizar_tabla_items(textos["fila"]))
+            continue
+
+        subtotal = _a_float(textos["subtotal"])
+        if subtotal is None:
+            continue
+
+        items.append({
+            "descripcion": textos["descripcion"].strip(),
+            "cantidad": _a_int(textos["cantidad"]),
+            "subtotal": subtotal,
+        })
+
+    return items
+
+
+def texto_tabla(textos_filas):
+
+    # Texto plano equivalente al OCR del bloque (logs y validación)
+
+    return " ".join(
+        textos["fila"] if "fila" in textos else " ".join(textos[c] for c in COLUMNAS)
+        for textos in textos_filas
+    ).strip()
@@ -1,62 +1,133 @@
-from fastapi import APIRouter, Depends, UploadFile, File
+from datetime import datetime
+
+from fastapi import APIRouter, Body, Depends, UploadFile, File, Query
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
-import numpy as np
-import cv2
 
 from db.session import get_db
-from services.ocr_service import process_invoice_img
-from services.invoice_service import create_invoice, factura_to_response, update_invoice, delete_invoice
-from schemas.invoice import InvoiceResponse, InvoiceCreate
+from services.ocr_service import procesar_subida
+from services.trabajos_lote import crear_trabajo, obtener_trabajo, obtener_resultados
+from services.invoice_service import (
+    create_invoice, factura_to_response, update_invoice, delete_invoice, consultar_facturas,
+    listar_facturas, create_invoices_bulk, resultado_error
+)
+from core.config import settings
+from schemas.invoice import InvoiceResponse, InvoiceCreate, InvoicePage
 from models import Factura
 
-from PIL import Image
-from pdf2image import convert_from_bytes
-import io
-
 from shared.errores import ServiceError, raise_service_error, ResponseErrors
+from shared import metricas
 
 router = APIRouter(prefix="/facturas")
 
 
+def formatear_resultado(resultado: dict):
+    return {
+        "tipo_factura": resultado.get("tipo_factura", ""),
+        "razon_social": resultado.get("razon_social", ""),
+        "cuit_emisor": resultado.get("cuit_emisor", ""),
+        "numero_factura": resultado.get("numero_factura", ""),
+        "fecha": resultado.get("fecha", ""),
+        "tabla_items": resultado.get("tabla_items", []),
+        "total": resultado.get("total", 0.0),
+    }
+
+
 @router.post("/upload")
-async def upload_factura(file: UploadFile = File(...)):
+async def upload_factura(file: UploadFile = File(...), todas_las_paginas: bool = False):
     contents = await file.read()
-    filename = file.filename.lower()
 
-    if filename.endswith((".jpg", ".jpeg")):
-        pil_img = Image.open(io.BytesIO(contents)).convert("RGB")
-        buf = io.BytesIO()
-        pil_img.save(buf, format="PNG")
-        contents = buf.getvalue()
+    # La extracción corre en el pool para no bloquear el event loop
+    try:
+        with metricas.medir("gd_etapa_segundos", etapa="subida"):
+            resultado = await procesar_subida(contents, file.filename, todas_las_paginas)
+    except ServiceError as e:
+        raise_service_error(e.error_key, e.detail, e.headers)
 
-    elif filename.endswith(".pdf"):
-        try:
-            pages = convert_from_bytes(contents, dpi=300)
-            pil_img = pages[0].convert("RGB")
-            buf = io.BytesIO()
-            pil_img.save(buf, format="PNG")
-            contents = buf.getvalue()
-        except Exception:
-            raise_service_error(ResponseErrors.PDF_INVALIDO)
+    # Con todas_las_paginas los PDFs devuelven un resultado por página;
+    # truncado indica que el PDF tenía más de PDF_MAX_PAGINAS
+    if "paginas" in resultado:
+        return {
+            "paginas": [
+                {"pagina": numero, **formatear_resultado(datos)}
+                for numero, datos in resultado["paginas"]
+            ],
+            "paginas_totales": resultado.get("paginas_totales", len(resultado["paginas"])),
+            "truncado": resultado.get("truncado", False),
+        }
+
+    return formatear_resultado(resultado)
 
-    img = cv2.imdecode(
-        np.frombuffer(contents, np.uint8),
-        cv2.IMREAD_COLOR
-    )
 
-    if img is None:
-        raise_service_error(ResponseErrors.IMAGEN_INVALIDA)
+# Tamaño de lectura de los archivos de un lote
+BLOQUE_LECTURA = 1024 * 1024
+
+
+def leer_acotado(file: UploadFile):
+
+    # Lee por bloques y corta apenas el archivo pasa TRABAJOS_MAX_MB_ARCHIVO,
+    # sin llegar a cargarlo entero en memoria
+
+    maximo = settings.TRABAJOS_MAX_MB_ARCHIVO * 1024 * 1024
+    partes = []
+    leidos = 0
+
+    while bloque := file.file.read(BLOQUE_LECTURA):
+        leidos += len(bloque)
+        if leidos > maximo:
+            raise ServiceError(
+                ResponseErrors.ARCHIVO_MUY_GRANDE,
+                f"{file.filename} supera el tamaño máximo de {settings.TRABAJOS_MAX_MB_ARCHIVO} MB"
+            )
+        partes.append(bloque)
+
+    return b"".join(partes)
+
+
+@router.post("/upload/batch", status_code=202)
+def upload_facturas_lote(files: list[UploadFile] = File(...)):
+
+    # Acepta varios archivos y/o ZIPs; se procesan en segundo plano. La
+    # cantidad se controla antes de leer nada (los ZIPs se vuelven a
+    # controlar al expandirse).
+    try:
+        if len(files) > settings.TRABAJOS_MAX_ARCHIVOS:
+            raise ServiceError(
+                ResponseErrors.DATOS_INVALIDOS,
+                f"Un lote admite como máximo {settings.TRABAJOS_MAX_ARCHIVOS} archivos"
+            )
+        archivos = [(f.filename, leer_acotado(f)) for f in files]
+        return crear_trabajo(archivos)
+    except ServiceError as e:
+        raise_service_error(e.error_key, e.detail)
+
+
+@router.get("/upload/batch/{job_id}")
+def estado_lote(job_id: str):
+    try:
+        return obtener_trabajo(job_id)
+    except ServiceError as e:
+        raise_service_error(e.error_key, e.detail)
+
 
-    resultado = process_invoice_img(img, file.filename)
+@router.get("/upload/batch/{job_id}/resultados")
+def resultados_lote(job_id: str):
+    try:
+        resumen, archivos = obtener_resultados(job_id)
+    except ServiceError as e:
+        raise_service_error(e.error_key, e.detail)
 
     return {
-        "tipo_factura": resultado.get("tipo_factura", ""),
-        "razon_social": resultado.get("razon_social", ""),
-        "cuit_emisor": resultado.get("cuit_emisor", ""),
-        "numero_factura": resultado.get("numero_factura", ""),
-        "fecha": resultado.get("fecha", ""),
-        "tabla_items": resultado.get("tabla_items", []),
-        "total": resultado.get("total", 0.0),
+        **resumen,
+        "resultados": [
+            {
+                "nombre": a["nombre"],
+                "estado": a["estado"],
+                "error": a["error"],
+                "factura": formatear_resultado(a["resultado"]) if a["resultado"] else None,
+            }
+            for a in archivos
+        ],
     }
 
 
@@ -72,20 +143,101 @@ def create_invoice_endpoint(
         raise_service_error(e.error_key, e.detail)
 
 
-@router.get("", response_model=list[InvoiceResponse])
-def list_invoices(db: Session = Depends(get_db)):
-    facturas = db.query(Factura).all()
-    return [factura_to_response(f) for f in facturas]
+def _parsear_fecha(valor: str | None):
+    if not valor:
+        return None
+    try:
+        return datetime.strptime(valor, "%d/%m/%Y").date()
+    except ValueError:
+        raise_service_error(ResponseErrors.DATOS_INVALIDOS, "Formato de fecha inválido, se espera dd/mm/aaaa")
+
+
+@router.post("/bulk")
+def create_invoices_bulk_endpoint(
+    payloads: list[dict] = Body(...),
+    db: Session = Depends(get_db)
+):
+
+    # Cada factura se valida por separado: las inválidas se informan en
+    # resultados y el resto se guarda igual
+
+    if len(payloads) > settings.BULK_MAX_FACTURAS:
+        raise_service_error(
+            ResponseErrors.DATOS_INVALIDOS,
+            f"Se admiten como máximo {settings.BULK_MAX_FACTURAS} facturas por pedido"
+        )
+
+    resultados = {}
+    validos = []
+    for indice, payload in enumerate(payloads):
+        try:
+            validos.append((indice, InvoiceCreate.model_validate(payload).model_dump()))
+        except ValidationError as e:
+            resultados[indice] = resultado_error(
+                ResponseErrors.DATOS_INVALIDOS,
+                "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            )
+
+    resultados.update(create_invoices_bulk(db, validos))
+    creadas = sum(r["estado"] == "ok" for r in resultados.values())
+
+    return {
+        "total": len(payloads),
+        "creadas": creadas,
+        "errores": len(payloads) - creadas,
+        "resultados": [{"indice": i, **resultados[i]} for i in range(len(payloads))],
+    }
+
+
+@router.get("", response_model=InvoicePage)
+def list_invoices(
+    cursor: str | None = None,
+    limite: int | None = Query(None, ge=1),
+    orden: str = "fecha",
+    direccion: str = Query("desc", pattern="^(asc|desc)$"),
+    busqueda: str | None = None,
+    cuit_emisor: str | None = None,
+    razon_social: str | None = None,
+    tipo_factura: str | None = None,
+    fecha_desde: str | None = None,
+    fecha_hasta: str | None = None,
+    total_min: float | None = None,
+    total_max: float | None = None,
+    db: Session = Depends(get_db)
+):
+    filtros = {
+        "busqueda": busqueda,
+        "cuit_emisor": cuit_emisor,
+        "razon_social": razon_social,
+        "tipo_factura": tipo_factura,
+        "fecha_desde": _parsear_fecha(fecha_desde),
+        "fecha_hasta": _parsear_fecha(fecha_hasta),
+        "total_min": total_min,
+        "total_max": total_max,
+    }
+
+    try:
+        with metricas.medir("gd_db_segundos", operacion="listar"):
+            facturas, siguiente = listar_facturas(
+                db, filtros, orden, direccion == "desc", limite, cursor
+            )
+            return {
+                "items": [factura_to_response(f) for f in facturas],
+                "siguiente_cursor": siguiente,
+            }
+    except ServiceError as e:
+        raise_service_error(e.error_key, e.detail)
 
 
 @router.get("/{invoice_id}", response_model=InvoiceResponse)
 def get_invoice(invoice_id: int, db: Session = Depends(get_db)):
-    factura = db.query(Factura).filter(Factura.id == invoice_id).first()
+    with metricas.medir("gd_db_segundos", operacion="obtener"):
+        factura = consultar_facturas(db).filter(Factura.id == invoice_id).first()
 
-    if not factura:
-        raise_service_error(ResponseErrors.NO_ENCONTRADO)
+        if not factura:
+            raise_service_error(ResponseErrors.NO_ENCONTRADO)
 
-    return factura_to_response(factura)
+        return factura_to_response(factura)
 
 @router.put("/{invoice_id}", response_model=InvoiceResponse)
 def update_invoice_endpoint(invoice_id: int, data: InvoiceCreate, db: Session = Depends(get_db)):
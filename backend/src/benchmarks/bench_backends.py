@@ -0,0 +1,114 @@
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+
+import cv2
+
+from core.config import settings
+from OCR.modelo_yolo import ruta_modelo, cargar_modelo
+
+# ==============================
+# BENCHMARK: backends de detección en CPU
+# ==============================
+# Compara latencia de inferencia y, si se pasa un dataset etiquetado, el mAP
+# de cada backend contra ML_module/metricas.json (modelo PyTorch original).
+#
+# Uso (desde backend/src):
+#   python -m benchmarks.bench_backends
+#   python -m benchmarks.bench_backends --data /ruta/etiquetas_yolo.yaml --salida reporte.json
+
+RAIZ = Path(__file__).resolve().parents[3]
+DATASET_DIR = RAIZ / "dataset" / "facturas_prueba_png"
+METRICAS_REFERENCIA = RAIZ / "ML_module" / "metricas.json"
+
+VARIANTES = [
+    ("pytorch", False),
+    ("onnx", False),
+    ("onnx", True),
+    ("openvino", False),
+    ("openvino", True),
+]
+
+
+def medir_latencia(model, imgs, repeticiones):
+    # Primera inferencia fuera de la medición (inicialización perezosa)
+    model(imgs[0], conf=settings.YOLO_CONF, imgsz=settings.YOLO_IMGSZ, verbose=False)
+
+    tiempos = []
+    for _ in range(repeticiones):
+        for img in imgs:
+            inicio = time.perf_counter()
+            model(img, conf=settings.YOLO_CONF, imgsz=settings.YOLO_IMGSZ, verbose=False)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+
+    tiempos.sort()
+    return {
+        "media_ms": round(statistics.mean(tiempos), 1),
+        "p50_ms": round(tiempos[len(tiempos) // 2], 1),
+        "p95_ms": round(tiempos[int(len(tiempos) * 0.95) - 1], 1),
+    }
+
+
+def medir_map(model, data, imgsz):
+    m = model.val(data=data, imgsz=imgsz, split="test", verbose=False, plots=False)
+    return {
+        "precision": float(m.box.mp),
+        "recall": float(m.box.mr),
+        "map50": float(m.box.map50),
+        "map75": float(m.box.map75),
+        "map50_95": float(m.box.map),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencia y mAP por backend de detección")
+    parser.add_argument("--imagenes", type=Path, default=DATASET_DIR)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--data", help="dataset YAML etiquetado para calcular mAP (split test)")
+    parser.add_argument("--imgsz", type=int, default=settings.YOLO_IMGSZ)
+    parser.add_argument("--salida", type=Path)
+    args = parser.parse_args()
+
+    imgs = [cv2.imread(str(p)) for p in sorted(args.imagenes.glob("*.png"))]
+    if not imgs:
+        raise SystemExit(f"No hay imágenes en {args.imagenes}")
+
+    referencia = json.loads(METRICAS_REFERENCIA.read_text())
+    reporte = {"referencia": referencia, "backends": []}
+    base_ms = None
+
+    for backend, int8 in VARIANTES:
+        ruta = ruta_modelo(backend, int8=int8)
+        fila = {"backend": backend, "int8": int8, "modelo": str(ruta)}
+
+        if not ruta.exists():
+            fila["omitido"] = "no exportado (ver OCR/exportar_modelo.py)"
+            reporte["backends"].append(fila)
+            continue
+
+        inicio = time.perf_counter()
+        model = cargar_modelo(ruta)
+        fila["carga_s"] = round(time.perf_counter() - inicio, 2)
+        fila["latencia"] = medir_latencia(model, imgs, args.repeticiones)
+
+        if base_ms is None:
+            base_ms = fila["latencia"]["media_ms"]
+        fila["speedup"] = round(base_ms / fila["latencia"]["media_ms"], 2)
+
+        if args.data:
+            fila["metricas"] = medir_map(model, args.data, args.imgsz)
+            fila["delta_map50_95"] = round(fila["metricas"]["map50_95"] - referencia["map50_95"], 4)
+            fila["delta_map50"] = round(fila["metricas"]["map50"] - referencia["map50"], 4)
+
+        reporte["backends"].append(fila)
+
+    salida = json.dumps(reporte, indent=2)
+    if args.salida:
+        args.salida.write_text(salida, encoding="utf-8")
+    print(salida)
+
+
+if __name__ == "__main__":
+    main()
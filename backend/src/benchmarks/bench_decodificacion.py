@@ -0,0 +1,104 @@
+import argparse
+import io
+import json
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+
+import cv2
+import numpy as np
+from pdf2image import convert_from_bytes
+from PIL import Image
+
+from services.documentos import decodificar_documento
+
+# ==============================
+# BENCHMARK: decodificación del upload a ndarray BGR
+# ==============================
+# "antes": el camino original del endpoint (PIL -> PNG en memoria -> cv2.imdecode)
+# "despues": services.documentos.decodificar_documento
+#
+# La memoria es el pico registrado por tracemalloc (buffers de numpy y de
+# Python); las asignaciones internas de libjpeg/libpng no se cuentan.
+#
+# Uso (desde backend/src):
+#   python -m benchmarks.bench_decodificacion --repeticiones 5
+
+DATASET_DIR = Path(__file__).resolve().parents[3] / "dataset"
+
+
+def decodificar_original(contents, filename):
+    if filename.endswith((".jpg", ".jpeg")):
+        pil_img = Image.open(io.BytesIO(contents)).convert("RGB")
+        buf = io.BytesIO()
+        pil_img.save(buf, format="PNG")
+        contents = buf.getvalue()
+
+    elif filename.endswith(".pdf"):
+        pages = convert_from_bytes(contents, dpi=300)
+        pil_img = pages[0].convert("RGB")
+        buf = io.BytesIO()
+        pil_img.save(buf, format="PNG")
+        contents = buf.getvalue()
+
+    return cv2.imdecode(np.frombuffer(contents, np.uint8), cv2.IMREAD_COLOR)
+
+
+def cargar_muestras():
+    png_path = sorted((DATASET_DIR / "facturas_prueba_png").glob("*.png"))[0]
+    pdf_path = sorted((DATASET_DIR / "facturas_prueba_pdf").glob("*.pdf"))[0]
+
+    png = png_path.read_bytes()
+    ok, jpg = cv2.imencode(".jpg", cv2.imread(str(png_path)), [cv2.IMWRITE_JPEG_QUALITY, 90])
+
+    return {
+        "png": (png, "muestra.png"),
+        "jpeg": (jpg.tobytes(), "muestra.jpg"),
+        "pdf": (pdf_path.read_bytes(), "muestra.pdf"),
+    }
+
+
+def medir(funcion, contents, filename, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        img = funcion(contents, filename)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+
+    tracemalloc.start()
+    img = funcion(contents, filename)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "media_ms": round(statistics.mean(tiempos), 2),
+        "min_ms": round(min(tiempos), 2),
+        "pico_mb": round(pico / 1024 / 1024, 1),
+        "shape": list(img.shape),
+    }, img
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo y memoria de decodificación por formato")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    reporte = {}
+    for formato, (contents, filename) in cargar_muestras().items():
+        antes, img_antes = medir(decodificar_original, contents, filename, args.repeticiones)
+        despues, img_despues = medir(decodificar_documento, contents, filename, args.repeticiones)
+
+        reporte[formato] = {
+            "antes": antes,
+            "despues": despues,
+            "ahorro_ms": round(antes["media_ms"] - despues["media_ms"], 2),
+            "ahorro_mb": round(antes["pico_mb"] - despues["pico_mb"], 1),
+            "pixeles_iguales": bool(np.array_equal(img_antes, img_despues)),
+        }
+
+    print(json.dumps(reporte, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+
+import cv2
+
+from core.config import settings
+from OCR.detectar_recortar_ROIs import detectar_recortar_roi_img
+from OCR.lector_ocr import ocr_roi
+from OCR.perfiles_ocr import perfil_para
+from OCR import motor_tesseract
+
+# ==============================
+# BENCHMARK: latencia de OCR por ROI
+# ==============================
+# Compara pytesseract (un subproceso por ROI) contra el pool de motores
+# tesserocr sobre los recortes reales de las facturas de prueba.
+#
+# Uso (desde backend/src):
+#   python -m benchmarks.bench_ocr_roi --repeticiones 3
+
+DATASET_DIR = Path(__file__).resolve().parents[3] / "dataset" / "facturas_prueba_png"
+
+
+def cargar_rois(carpeta, limite):
+    rois = []
+    for ruta in sorted(carpeta.glob("*.png"))[:limite]:
+        img = cv2.imread(str(ruta))
+        if img is None:
+            continue
+        for campo, info in detectar_recortar_roi_img(img, ruta.stem).items():
+            rois.append((campo, info["roi"]))
+    return rois
+
+
+def medir(rois, motor, repeticiones):
+    settings.OCR_MOTOR = motor
+    tiempos = []
+    textos = []
+
+    # Una pasada sin medir para que ambos motores partan calientes
+    ocr_roi(rois[0][1])
+
+    for _ in range(repeticiones):
+        for campo, roi in rois:
+            inicio = time.perf_counter()
+            textos.append(ocr_roi(roi, perfil_para(campo)))
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+
+    tiempos.sort()
+    return {
+        "motor": motor,
+        "rois": len(tiempos),
+        "media_ms": round(statistics.mean(tiempos), 2),
+        "p50_ms": round(tiempos[len(tiempos) // 2], 2),
+        "p95_ms": round(tiempos[int(len(tiempos) * 0.95) - 1], 2),
+    }, textos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencia de OCR por ROI antes/después del pool de motores")
+    parser.add_argument("--carpeta", type=Path, default=DATASET_DIR)
+    parser.add_argument("--facturas", type=int, default=6)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    rois = cargar_rois(args.carpeta, args.facturas)
+    if not rois:
+        raise SystemExit(f"No se encontraron ROIs en {args.carpeta}")
+
+    motor_original = settings.OCR_MOTOR
+    resultados = []
+
+    antes, textos_antes = medir(rois, "pytesseract", args.repeticiones)
+    resultados.append(antes)
+
+    if motor_tesseract.tesserocr is not None:
+        despues, textos_despues = medir(rois, "tesserocr", args.repeticiones)
+        despues["textos_iguales"] = sum(a == b for a, b in zip(textos_antes, textos_despues))
+        despues["speedup"] = round(antes["media_ms"] / despues["media_ms"], 2)
+        resultados.append(despues)
+        motor_tesseract.cerrar_motores()
+    else:
+        print("tesserocr no está instalado: solo se mide pytesseract")
+
+    settings.OCR_MOTOR = motor_original
+    print(json.dumps(resultados, indent=2))
+
+
+if __name__ == "__main__":
+    main()
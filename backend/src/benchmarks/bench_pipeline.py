@@ -0,0 +1,352 @@
+import argparse
+import importlib.util
+import json
+import multiprocessing
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, wait
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows: sin CPU de los subprocesos
+    resource = None
+
+import cv2
+
+from core.config import settings
+from services.documentos import decodificar_documento, iter_paginas_pdf
+from OCR.detectar_recortar_ROIs import detectar_recortar_roi_img
+from OCR.pipeline_detectar_yolo_ocr import procesar_factura_img
+from OCR.extraer_ocr import extraer_factura_backend, armar_salida, VERSION_PIPELINE
+
+# ==============================
+# BENCHMARK: pipeline de extracción completo
+# ==============================
+# Genera un corpus fijo (semilla) con dataset/generar_facturas.py, lo
+# rasteriza a PNG y mide latencia (p50/p95) y throughput de cada etapa
+# (decodificación, detección, OCR, normalización) y de
+# extraer_factura_backend completo, con distintos niveles de concurrencia.
+#
+# Cada nivel corre en un pool de procesos spawn como el de producción
+# (EXTRACCION_MODO="procesos"): un modelo por worker, calentado antes de
+# medir. La caché de plantillas se apaga para que la detección corra siempre.
+# cpu_ms_doc es CPU del worker más la de sus subprocesos (tesseract) por
+# documento; con --memoria se agrega el pico de tracemalloc por etapa.
+#
+# Uso (desde backend/src):
+#   python -m benchmarks.bench_pipeline --salida base.json
+#   python -m benchmarks.bench_pipeline --comparar base.json
+#   python -m benchmarks.bench_pipeline --actual nuevo.json --comparar base.json
+
+GENERADOR = Path(__file__).resolve().parents[3] / "dataset" / "generar_facturas.py"
+
+ETAPAS = ["decodificacion", "deteccion", "ocr", "normalizacion", "extraccion"]
+
+# (métrica, True si subir es peor)
+METRICAS_COMPARADAS = [
+    ("p50_ms", True),
+    ("p95_ms", True),
+    ("docs_s", False),
+    ("cpu_ms_doc", True),
+    ("pico_mb", True),
+]
+
+
+# ==============================
+# CORPUS
+# ==============================
+
+def generar_corpus(directorio, semilla, por_tipo):
+
+    # Reutiliza el corpus si ya existe con la misma semilla y tamaño
+
+    manifiesto = directorio / "manifiesto.json"
+    if manifiesto.exists():
+        datos = json.loads(manifiesto.read_text(encoding="utf-8"))
+        if datos["semilla"] == semilla and datos["por_tipo"] == por_tipo:
+            return [directorio / nombre for nombre in datos["imagenes"]]
+
+    directorio.mkdir(parents=True, exist_ok=True)
+
+    # El generador crea OUTDIR ("facturas") relativo al cwd al importarse
+    cwd = os.getcwd()
+    os.chdir(directorio)
+    try:
+        from reportlab import rl_config
+        rl_config.invariant = 1  # PDFs sin fecha de creación ni ids aleatorios
+
+        spec = importlib.util.spec_from_file_location("generar_facturas", GENERADOR)
+        generador = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(generador)
+
+        random.seed(semilla)
+        generador.fake.seed_instance(semilla)
+
+        imagenes = []
+        for tipo in generador.TIPOS:
+            for i in range(por_tipo):
+                pdf = directorio / f"factura_{tipo}_{i:04d}.pdf"
+                generador.draw_factura(str(pdf), tipo, generador.gen_meta(tipo))
+
+                _, img = next(iter_paginas_pdf(pdf.read_bytes()))
+                png = pdf.with_suffix(".png")
+                cv2.imwrite(str(png), img)
+                pdf.unlink()
+                imagenes.append(png)
+    finally:
+        os.chdir(cwd)
+
+    manifiesto.write_text(json.dumps({
+        "semilla": semilla,
+        "por_tipo": por_tipo,
+        "imagenes": [p.name for p in imagenes],
+    }), encoding="utf-8")
+    return imagenes
+
+
+# ==============================
+# MEDICIÓN
+# ==============================
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def _cpu():
+
+    # CPU del proceso más la de los hijos ya terminados: pytesseract corre
+    # tesseract como subproceso y process_time() no lo ve
+
+    if resource is None:
+        return time.process_time()
+    propio = resource.getrusage(resource.RUSAGE_SELF)
+    hijos = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return propio.ru_utime + propio.ru_stime + hijos.ru_utime + hijos.ru_stime
+
+
+def _etapa(nombre, entrada):
+    if nombre == "decodificacion":
+        return decodificar_documento(*entrada)
+    if nombre == "deteccion":
+        return detectar_recortar_roi_img(*entrada)
+    if nombre == "ocr":
+        (img, image_id), detecciones = entrada
+        return procesar_factura_img(img, image_id, detecciones)
+    if nombre == "normalizacion":
+        return armar_salida(entrada)
+    return extraer_factura_backend(*entrada)
+
+
+def _medir_en_worker(nombre, entrada, memoria):
+
+    # Corre en el worker: cada proceso atiende un documento a la vez, así
+    # las diferencias de CPU son de este documento
+
+    if memoria:
+        tracemalloc.start()
+
+    inicio, inicio_cpu = time.perf_counter(), _cpu()
+    salida = _etapa(nombre, entrada)
+    segundos, cpu = time.perf_counter() - inicio, _cpu() - inicio_cpu
+
+    pico = None
+    if memoria:
+        pico = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return segundos, cpu, pico, salida
+
+
+def _inicializar_worker(documento):
+
+    # spawn no hereda los ajustes cambiados en main(): se repiten acá.
+    # Una extracción completa carga el modelo y los motores de OCR.
+    settings.PLANTILLAS_CACHE = False
+    extraer_factura_backend(decodificar_documento(*documento), "warmup")
+
+
+def _ping():
+    time.sleep(0.2)
+    return os.getpid()
+
+
+def crear_pool(concurrencia, documento):
+
+    # Espera a que los `concurrencia` workers estén arrancados y calentados,
+    # así el warm-up no cae dentro de la primera etapa medida
+
+    pool = ProcessPoolExecutor(
+        max_workers=concurrencia,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_inicializar_worker,
+        initargs=(documento,),
+    )
+    pids = set()
+    while len(pids) < concurrencia:
+        futuros = [pool.submit(_ping) for _ in range(concurrencia)]
+        wait(futuros)
+        pids.update(f.result() for f in futuros)
+    return pool
+
+
+def medir_etapa(pool, nombre, entradas, memoria=False):
+
+    # Un documento por tarea; devuelve métricas y las salidas en el orden
+    # de entrada. El throughput incluye el pasaje de datos entre procesos.
+
+    inicio = time.perf_counter()
+    futuros = [pool.submit(_medir_en_worker, nombre, entrada, memoria) for entrada in entradas]
+    medidas = [f.result() for f in futuros]
+    total = time.perf_counter() - inicio
+
+    tiempos = [m[0] * 1000 for m in medidas]
+    fila = {
+        "n": len(tiempos),
+        "media_ms": round(statistics.mean(tiempos), 1),
+        "p50_ms": round(percentil(tiempos, 0.50), 1),
+        "p95_ms": round(percentil(tiempos, 0.95), 1),
+        "docs_s": round(len(tiempos) / total, 2),
+        "cpu_ms_doc": round(sum(m[1] for m in medidas) * 1000 / len(tiempos), 1),
+    }
+
+    if memoria:
+        fila["pico_mb"] = round(max(m[2] for m in medidas) / 1024 / 1024, 1)
+
+    return fila, [m[3] for m in medidas]
+
+
+def correr(imagenes, niveles, repeticiones, memoria=False):
+    documentos = [(p.read_bytes(), p.name) for p in imagenes]
+    resultados = {etapa: {} for etapa in ETAPAS}
+
+    for concurrencia in niveles:
+        with crear_pool(concurrencia, documentos[0]) as pool:
+            for _ in range(repeticiones):
+                fila, imgs = medir_etapa(pool, "decodificacion", documentos, memoria)
+                _acumular(resultados["decodificacion"], concurrencia, fila)
+
+                entradas = [(img, nombre) for img, (_, nombre) in zip(imgs, documentos)]
+
+                fila, detecciones = medir_etapa(pool, "deteccion", entradas, memoria)
+                _acumular(resultados["deteccion"], concurrencia, fila)
+
+                fila, crudos = medir_etapa(pool, "ocr", list(zip(entradas, detecciones)), memoria)
+                _acumular(resultados["ocr"], concurrencia, fila)
+
+                fila, _ = medir_etapa(pool, "normalizacion", crudos, memoria)
+                _acumular(resultados["normalizacion"], concurrencia, fila)
+
+                fila, _ = medir_etapa(pool, "extraccion", entradas, memoria)
+                _acumular(resultados["extraccion"], concurrencia, fila)
+
+    return resultados
+
+
+def _acumular(por_nivel, concurrencia, fila):
+
+    # Con varias repeticiones se queda la mejor (menos ruido del sistema)
+
+    clave = str(concurrencia)
+    if clave not in por_nivel or fila["p50_ms"] < por_nivel[clave]["p50_ms"]:
+        por_nivel[clave] = fila
+
+
+# ==============================
+# COMPARACIÓN
+# ==============================
+
+def comparar(base, actual, tolerancia):
+
+    # Regresión: latencia, CPU o memoria más altas, o throughput más bajo
+    # que la base, por encima de la tolerancia (fracción)
+
+    regresiones = []
+    for etapa, por_nivel in actual["resultados"].items():
+        for nivel, fila in por_nivel.items():
+            ref = base["resultados"].get(etapa, {}).get(nivel)
+            if ref is None:
+                continue
+
+            for metrica, peor_si_sube in METRICAS_COMPARADAS:
+                if not ref.get(metrica) or metrica not in fila:
+                    continue
+                cambio = (fila[metrica] - ref[metrica]) / ref[metrica]
+                if (cambio if peor_si_sube else -cambio) > tolerancia:
+                    regresiones.append({
+                        "etapa": etapa,
+                        "concurrencia": int(nivel),
+                        "metrica": metrica,
+                        "base": ref[metrica],
+                        "actual": fila[metrica],
+                        "cambio": round(cambio, 3),
+                    })
+    return regresiones
+
+
+# ==============================
+# MAIN
+# ==============================
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencia y throughput del pipeline de extracción")
+    parser.add_argument("--semilla", type=int, default=1234)
+    parser.add_argument("--por-tipo", type=int, default=10, help="facturas por tipo (A, B, C)")
+    parser.add_argument("--corpus", type=Path, help="directorio del corpus (por defecto en /tmp)")
+    parser.add_argument("--concurrencia", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--repeticiones", type=int, default=1)
+    parser.add_argument("--memoria", action="store_true", help="medir el pico de memoria por etapa")
+    parser.add_argument("--salida", type=Path, help="guardar el resultado en JSON")
+    parser.add_argument("--actual", type=Path, help="usar un resultado guardado en vez de correr")
+    parser.add_argument("--comparar", type=Path, help="resultado base contra el que comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.10)
+    args = parser.parse_args()
+
+    if args.actual:
+        reporte = json.loads(args.actual.read_text(encoding="utf-8"))
+    else:
+        settings.PLANTILLAS_CACHE = False
+
+        corpus = args.corpus or Path(tempfile.gettempdir()) / f"gd_bench_{args.semilla}_{args.por_tipo}"
+        imagenes = generar_corpus(corpus, args.semilla, args.por_tipo)
+
+        reporte = {
+            "meta": {
+                "semilla": args.semilla,
+                "documentos": len(imagenes),
+                "repeticiones": args.repeticiones,
+                "ejecucion": "procesos",
+                "version_pipeline": VERSION_PIPELINE,
+                "detector": settings.DETECTOR_BACKEND,
+                "int8": settings.DETECTOR_INT8,
+                "ocr_motor": settings.OCR_MOTOR,
+                "python": platform.python_version(),
+                "cpus": os.cpu_count(),
+            },
+            "resultados": correr(imagenes, args.concurrencia, args.repeticiones, args.memoria),
+        }
+
+    if args.salida:
+        args.salida.write_text(json.dumps(reporte, indent=2), encoding="utf-8")
+
+    if not args.comparar:
+        print(json.dumps(reporte, indent=2))
+        return
+
+    base = json.loads(args.comparar.read_text(encoding="utf-8"))
+    regresiones = comparar(base, reporte, args.tolerancia)
+    print(json.dumps({"tolerancia": args.tolerancia, "regresiones": regresiones}, indent=2))
+
+    if regresiones:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
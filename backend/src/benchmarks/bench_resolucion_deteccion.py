@@ -0,0 +1,114 @@
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+
+import cv2
+
+from core.config import settings
+from OCR.detectar_recortar_ROIs import CLASSES, reducir_para_deteccion, cajas_de_resultados
+from OCR.modelo_yolo import get_model
+
+# ==============================
+# BENCHMARK: resolución de entrada del detector
+# ==============================
+# Para cada lado máximo mide la latencia de detección (reducción + modelo) y
+# cuánto se parecen las cajas a las de la página completa (IoU medio por
+# clase y clases perdidas). La referencia es el camino anterior: la página
+# entera pasada al modelo con imgsz=YOLO_IMGSZ.
+#
+# Uso (desde backend/src):
+#   python -m benchmarks.bench_resolucion_deteccion --lados 640 960 1280
+
+DATASET_DIR = Path(__file__).resolve().parents[3] / "dataset" / "facturas_prueba_png"
+
+
+def iou(a, b):
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, ix2 - ix1) * max(0.0, iy2 - iy1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def mejores_por_clase(cajas):
+    mejores = {}
+    for cls_id, conf, xyxy in cajas:
+        if cls_id not in mejores or conf > mejores[cls_id][0]:
+            mejores[cls_id] = (conf, xyxy)
+    return {cls_id: xyxy for cls_id, (_, xyxy) in mejores.items()}
+
+
+def detectar_referencia(model, img):
+    results = model(img, conf=settings.YOLO_CONF, imgsz=settings.YOLO_IMGSZ, verbose=False)[0]
+    return cajas_de_resultados(results)
+
+
+def detectar_reducida(model, img, lado):
+    chica, escala, imgsz = reducir_para_deteccion(img, lado)
+    results = model(chica, conf=settings.YOLO_CONF, imgsz=imgsz, verbose=False)[0]
+    return cajas_de_resultados(results, escala)
+
+
+def medir(funcion, imgs, repeticiones):
+    tiempos, salidas = [], []
+    for _ in range(repeticiones):
+        salidas = []
+        for img in imgs:
+            inicio = time.perf_counter()
+            salidas.append(funcion(img))
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+    return round(statistics.mean(tiempos), 1), salidas
+
+
+def comparar(referencias, candidatas):
+    ious = {c: [] for c in CLASSES}
+    perdidas = 0
+
+    for ref, cand in zip(referencias, candidatas):
+        ref, cand = mejores_por_clase(ref), mejores_por_clase(cand)
+        for cls_id, caja in ref.items():
+            if cls_id not in cand:
+                perdidas += 1
+                continue
+            ious[CLASSES[cls_id]].append(iou(caja, cand[cls_id]))
+
+    return {
+        "iou_medio": {c: round(statistics.mean(v), 3) for c, v in ious.items() if v},
+        "clases_perdidas": perdidas,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencia vs. precisión según la resolución de detección")
+    parser.add_argument("--imagenes", type=Path, default=DATASET_DIR)
+    parser.add_argument("--lados", type=int, nargs="+", default=[640, 960, 1280])
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    imgs = [cv2.imread(str(p)) for p in sorted(args.imagenes.glob("*.png"))]
+    if not imgs:
+        raise SystemExit(f"No hay imágenes en {args.imagenes}")
+
+    model = get_model()
+    detectar_referencia(model, imgs[0])  # warm-up
+
+    settings.DETECCION_REDUCIDA = True
+    ref_ms, referencias = medir(lambda img: detectar_referencia(model, img), imgs, args.repeticiones)
+    reporte = [{"lado": "pagina_completa", "media_ms": ref_ms}]
+
+    for lado in args.lados:
+        media_ms, candidatas = medir(lambda img: detectar_reducida(model, img, lado), imgs, args.repeticiones)
+        reporte.append({
+            "lado": lado,
+            "media_ms": media_ms,
+            "speedup": round(ref_ms / media_ms, 2),
+            **comparar(referencias, candidatas),
+        })
+
+    print(json.dumps(reporte, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,16 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from core.config import settings
 from api.invoices import router
+from OCR.modelo_yolo import estado_modelo
+from services.ejecutor_extraccion import (
+    iniciar_extraccion, cerrar_extraccion, extraccion_lista, estado_extraccion
+)
+from services.cache_resultados import estadisticas_cache
+from OCR.cache_plantillas import estadisticas_plantillas
+from shared.metricas import exportar_texto
+from services.trabajos_lote import iniciar_trabajos
 
 app = FastAPI(
     title=settings.APP_NAME,
@@ -20,5 +29,40 @@ app.add_middleware(
 app.include_router(router, tags=["Facturas"])
 
 
+# Pool de extracción (y warm-up si YOLO_WARMUP_AL_INICIAR) sin bloquear el arranque
+@app.on_event("startup")
+def iniciar_modelo():
+    iniciar_extraccion()
+    iniciar_trabajos()
+
+
+@app.on_event("shutdown")
+def detener_extraccion():
+    cerrar_extraccion()
+
+
+# Health checks
+@app.get("/health", tags=["Estado"])
+def health():
+    return {"status": "ok"}
+
+
+@app.get("/ready", tags=["Estado"])
+def ready():
+    estado = {
+        "modelo": estado_modelo(),
+        "extraccion": estado_extraccion(),
+        "cache": estadisticas_cache(),
+        "plantillas": estadisticas_plantillas(),
+    }
+    if not extraccion_lista():
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "not ready", **estado}
+        )
+    return {"status": "ready", **estado}
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return PlainTextResponse(exportar_texto(), media_type="text/plain; version=0.0.4")
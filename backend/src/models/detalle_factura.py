@@ -10,5 +10,5 @@ class DetalleFactura(Base):
     cantidad = Column(Integer, nullable=False)
     subtotal = Column(Float, nullable=False)
 
-    factura_id = Column(Integer, ForeignKey("facturas.id"))
+    factura_id = Column(Integer, ForeignKey("facturas.id"), index=True)
     factura = relationship("Factura", back_populates="detalles")
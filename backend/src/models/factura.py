@@ -1,23 +1,30 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, Float, Index
 from sqlalchemy.orm import relationship
 from .base import Base
 
 class Factura(Base):
     __tablename__ = "facturas"
+    __table_args__ = (
+        # Orden del listado paginado: (columna, id)
+        Index("ix_facturas_fecha_id", "fecha", "id"),
+        Index("ix_facturas_total_id", "total", "id"),
+        Index("ix_facturas_numero_factura_id", "numero_factura", "id"),
+    )
 
     id = Column(Integer, primary_key=True)
     numero_factura = Column(String, unique=True, nullable=False)
     fecha = Column(Date)
-    tipo_factura = Column(String)
+    tipo_factura = Column(String, index=True)
     total = Column(Float)
 
-    proveedor_id = Column(Integer, ForeignKey("proveedores.id"))
+    proveedor_id = Column(Integer, ForeignKey("proveedores.id"), index=True)
 
     proveedor = relationship("Proveedor")
     detalles = relationship(
         "DetalleFactura",
         back_populates="factura",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        order_by="DetalleFactura.id",  # orden de la tabla de items
     )
 
 
@@ -123,3 +123,8 @@ class InvoiceResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class InvoicePage(BaseModel):
+    items: List[InvoiceResponse]
+    siguiente_cursor: str | None
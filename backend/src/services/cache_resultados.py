@@ -0,0 +1,190 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from core.config import settings
+from OCR.extraer_ocr import VERSION_PIPELINE
+from OCR.modelo_yolo import huella_modelo
+
+logger = logging.getLogger(__name__)
+
+# ==============================
+# CACHÉ DE RESULTADOS DE EXTRACCIÓN
+# ==============================
+# Dos niveles: LRU en memoria (por proceso) y, si CACHE_RESULTADOS_DIR está
+# configurado, JSON en disco compartido entre workers con desalojo por tamaño.
+# Las claves incluyen la versión del pipeline y la huella del modelo, así un
+# cambio de pesos o de lógica invalida todo sin tener que borrar nada. Los
+# ajustes que cambian el resultado (AJUSTES_CLAVE) también son parte de la
+# clave: cambiar una variable de entorno no devuelve extracciones viejas.
+#
+# Se consulta solo en el proceso de la API, antes de mandar el trabajo al
+# pool, así los contadores de /ready cubren todas las consultas. Desde el
+# event loop se llama vía run_in_threadpool: el nivel de disco bloquea.
+
+AJUSTES_CLAVE = (
+    "DETECCION_REDUCIDA",
+    "YOLO_IMGSZ",
+    "YOLO_CONF",
+    "OCR_CASCADA",
+    "OCR_CASCADA_MAX_PASADAS",
+    "OCR_BINARIZAR_PAGINA",
+)
+
+_memoria = OrderedDict()
+_lock = threading.Lock()
+
+_contadores = {
+    "hits_memoria": 0,
+    "hits_disco": 0,
+    "misses": 0,
+    "guardados": 0,
+    "desalojados_disco": 0,
+}
+
+
+def _version():
+    ajustes = "|".join(f"{nombre}={getattr(settings, nombre)}" for nombre in AJUSTES_CLAVE)
+    return f"{VERSION_PIPELINE}|{huella_modelo()}|{ajustes}"
+
+
+def clave_contenido(contents: bytes, todas_las_paginas: bool = False):
+    h = hashlib.sha256(contents).hexdigest()
+    return _clave("sha256", f"{h}|{int(todas_las_paginas)}")
+
+
+def _clave(tipo, valor):
+    return hashlib.sha256(f"{_version()}|{tipo}|{valor}".encode()).hexdigest()
+
+
+# ==============================
+# LECTURA / ESCRITURA
+# ==============================
+
+def obtener(clave):
+    if not settings.CACHE_RESULTADOS:
+        return None
+
+    with _lock:
+        if clave in _memoria:
+            _memoria.move_to_end(clave)
+            _contadores["hits_memoria"] += 1
+            return _memoria[clave]
+
+    resultado = _leer_disco(clave)
+    if resultado is not None:
+        _sumar("hits_disco")
+        _guardar_memoria(clave, resultado)
+        return resultado
+
+    _sumar("misses")
+    return None
+
+
+def guardar(clave, resultado):
+    if not settings.CACHE_RESULTADOS:
+        return
+
+    _guardar_memoria(clave, resultado)
+    _escribir_disco(clave, resultado)
+    _sumar("guardados")
+
+
+def _sumar(contador, n=1):
+    # Las consultas llegan desde el threadpool de la API y los hilos de lotes
+    with _lock:
+        _contadores[contador] += n
+
+
+def _guardar_memoria(clave, resultado):
+    with _lock:
+        _memoria[clave] = resultado
+        _memoria.move_to_end(clave)
+        while len(_memoria) > settings.CACHE_RESULTADOS_MAX_ITEMS:
+            _memoria.popitem(last=False)
+
+
+def _dir_disco():
+    return Path(settings.CACHE_RESULTADOS_DIR) if settings.CACHE_RESULTADOS_DIR else None
+
+
+def _leer_disco(clave):
+    directorio = _dir_disco()
+    if directorio is None:
+        return None
+
+    ruta = directorio / f"{clave}.json"
+    try:
+        with open(ruta, "r", encoding="utf-8") as f:
+            resultado = json.load(f)
+        os.utime(ruta)  # marca de uso para el desalojo LRU
+        return resultado
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning("Entrada de caché ilegible %s: %s", ruta, e)
+        ruta.unlink(missing_ok=True)
+        return None
+
+
+def _escribir_disco(clave, resultado):
+    directorio = _dir_disco()
+    if directorio is None:
+        return
+
+    try:
+        directorio.mkdir(parents=True, exist_ok=True)
+        tmp = directorio / f"{clave}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, ensure_ascii=False)
+        os.replace(tmp, directorio / f"{clave}.json")
+        _desalojar_disco(directorio)
+    except Exception as e:
+        logger.warning("No se pudo escribir la caché en disco: %s", e)
+
+
+def _desalojar_disco(directorio):
+
+    # Borra las entradas usadas hace más tiempo hasta quedar bajo el límite
+
+    max_bytes = settings.CACHE_RESULTADOS_DISCO_MAX_MB * 1024 * 1024
+    entradas = []
+    total = 0
+
+    for ruta in directorio.glob("*.json"):
+        try:
+            st = ruta.stat()
+        except FileNotFoundError:
+            continue
+        entradas.append((st.st_mtime, st.st_size, ruta))
+        total += st.st_size
+
+    if total <= max_bytes:
+        return
+
+    for _, tam, ruta in sorted(entradas):
+        ruta.unlink(missing_ok=True)
+        total -= tam
+        _sumar("desalojados_disco")
+        if total <= max_bytes:
+            break
+
+
+def estadisticas_cache():
+    with _lock:
+        contadores = dict(_contadores)
+        items_memoria = len(_memoria)
+
+    consultas = contadores["hits_memoria"] + contadores["hits_disco"] + contadores["misses"]
+    hits = consultas - contadores["misses"]
+
+    return {
+        "activa": settings.CACHE_RESULTADOS,
+        "items_memoria": items_memoria,
+        **contadores,
+        "hit_rate": round(hits / consultas, 3) if consultas else 0.0,
+    }
@@ -0,0 +1,106 @@
+import io
+import os
+import tempfile
+
+import cv2
+import numpy as np
+from pdf2image import convert_from_bytes, pdfinfo_from_bytes
+from PIL import Image
+
+from core.config import settings
+from shared.errores import ServiceError, ResponseErrors
+
+
+# ==============================
+# PDF
+# ==============================
+
+def contar_paginas_pdf(contents: bytes) -> int:
+    try:
+        return int(pdfinfo_from_bytes(contents)["Pages"])
+    except Exception as e:
+        raise ServiceError(ResponseErrors.PDF_INVALIDO, str(e))
+
+
+def iter_paginas_pdf(contents: bytes, max_paginas: int | None = 1, dpi: int | None = None):
+    # Una sola llamada a pdftoppm para todo el rango [1, límite]. La primera
+    # página sola se rasteriza en memoria; con más páginas se escriben como
+    # PNG en un directorio temporal y se cargan de a una, así nunca hay más
+    # de una página decodificada en memoria. Las páginas que pasan de
+    # PDF_MAX_PAGINAS no se rasterizan (ver contar_paginas_pdf).
+    dpi = dpi or settings.PDF_DPI
+    limite = min(max_paginas or settings.PDF_MAX_PAGINAS, settings.PDF_MAX_PAGINAS)
+
+    if limite == 1:
+        try:
+            pagina = convert_from_bytes(contents, dpi=dpi, first_page=1, last_page=1)[0]
+        except Exception as e:
+            raise ServiceError(ResponseErrors.PDF_INVALIDO, str(e))
+        img = pil_a_bgr(pagina)
+        del pagina
+        yield 1, img
+        return
+
+    with tempfile.TemporaryDirectory(prefix="gd_pdf_") as directorio:
+        try:
+            rutas = convert_from_bytes(
+                contents, dpi=dpi, first_page=1, last_page=limite,
+                output_folder=directorio, fmt="png", paths_only=True
+            )
+        except Exception as e:
+            raise ServiceError(ResponseErrors.PDF_INVALIDO, str(e))
+
+        for numero, ruta in enumerate(rutas, start=1):
+            img = cv2.imread(ruta, cv2.IMREAD_COLOR)
+            os.remove(ruta)
+            if img is None:
+                raise ServiceError(ResponseErrors.PDF_INVALIDO, f"No se pudo leer la página {numero}")
+            yield numero, img
+
+
+# ==============================
+# IMÁGENES
+# ==============================
+# Todo termina en un ndarray BGR uint8, que es lo que espera el pipeline,
+# sin pasar por copias intermedias codificadas (PNG en memoria).
+
+def pil_a_bgr(pil_img):
+    if pil_img.mode != "RGB":
+        pil_img = pil_img.convert("RGB")
+
+    # Copia escribible de los píxeles y swap RGB -> BGR en el mismo buffer
+    img = np.array(pil_img)
+    cv2.cvtColor(img, cv2.COLOR_RGB2BGR, dst=img)
+    return img
+
+
+def decodificar_imagen(contents: bytes):
+
+    # OpenCV decodifica JPEG/PNG/TIFF/BMP/WebP directo desde los bytes.
+    # Para formatos que no soporta se cae a PIL.
+
+    img = cv2.imdecode(
+        np.frombuffer(contents, np.uint8),
+        cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION
+    )
+
+    if img is None:
+        try:
+            with Image.open(io.BytesIO(contents)) as pil_img:
+                img = pil_a_bgr(pil_img)
+        except Exception:
+            raise ServiceError(ResponseErrors.IMAGEN_INVALIDA)
+
+    return img
+
+
+def decodificar_documento(contents: bytes, filename: str):
+
+    # Primera página (o la imagen) ya decodificada como BGR
+
+    if filename.lower().endswith(".pdf"):
+        for _, img in iter_paginas_pdf(contents, max_paginas=1):
+            return img
+        raise ServiceError(ResponseErrors.PDF_INVALIDO)
+
+    return decodificar_imagen(contents)
@@ -0,0 +1,338 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from core.config import settings
+from OCR.modelo_yolo import warmup_model, warmup_model_en_segundo_plano, modelo_listo
+from shared.errores import ServiceError, ResponseErrors
+from shared import metricas
+
+logger = logging.getLogger(__name__)
+
+# ==============================
+# POOL DE EXTRACCIÓN
+# ==============================
+# YOLO + OpenCV + Tesseract son CPU y bloquean; se ejecutan fuera del event
+# loop en un pool de procesos (EXTRACCION_MODO="procesos") o de hilos
+# ("hilos"). La admisión está acotada: con EXTRACCION_MAX_EN_VUELO trabajos
+# en curso o en cola, las nuevas subidas reciben 503 con Retry-After.
+#
+# Los trabajos por lotes entran por un carril aparte, acotado a
+# EXTRACCION_MAX_EN_VUELO_LOTE archivos a la vez: ocupan lugar en el pool y
+# por eso también cuentan para el límite de las subidas interactivas.
+#
+# Si un worker muere el pool queda roto (BrokenProcessPool): se recrea y se
+# vuelve a calentar, y /ready responde 503 hasta que esté listo otra vez.
+
+INTENTOS_WARMUP = 10
+
+_executor = None
+_lock = threading.Lock()
+_pool_listo = threading.Event()
+_en_worker = False  # True dentro de los procesos del pool
+
+# Los contadores se tocan desde el event loop y desde los hilos de lotes
+_lock_metricas = threading.Lock()
+_semaforo_lote = threading.BoundedSemaphore(max(1, settings.EXTRACCION_MAX_EN_VUELO_LOTE))
+
+_metricas = {
+    "en_vuelo": 0,
+    "en_vuelo_lote": 0,
+    "procesadas": 0,
+    "procesadas_lote": 0,
+    "rechazadas": 0,
+    "errores": 0,
+    "errores_lote": 0,
+    "reinicios_pool": 0,
+    "espera_total_s": 0.0,
+    "espera_max_s": 0.0,
+    "duracion_total_s": 0.0,
+}
+
+
+def _modo_procesos():
+    return settings.EXTRACCION_MODO == "procesos"
+
+
+def _inicializar_worker():
+    global _en_worker
+
+    # Cada proceso carga y calienta su propia copia del modelo al arrancar
+    _en_worker = True
+    try:
+        warmup_model()
+    except Exception as e:
+        logger.error("No se pudo calentar el modelo en el worker: %s", e)
+
+
+def _ping():
+
+    # La pausa mantiene ocupado al worker para que los pings de una misma
+    # ronda se repartan entre procesos distintos
+
+    time.sleep(0.05)
+    return os.getpid(), modelo_listo()
+
+
+def get_executor():
+    global _executor
+
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                if _modo_procesos():
+                    # spawn: torch no se lleva bien con fork + hilos
+                    _executor = ProcessPoolExecutor(
+                        max_workers=settings.EXTRACCION_WORKERS,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_inicializar_worker,
+                    )
+                else:
+                    _executor = ThreadPoolExecutor(
+                        max_workers=settings.EXTRACCION_WORKERS,
+                        thread_name_prefix="extraccion",
+                    )
+    return _executor
+
+
+def iniciar_extraccion():
+
+    # Arranca los workers y calienta el modelo sin bloquear el startup
+
+    if not _modo_procesos():
+        warmup_model_en_segundo_plano()
+        return
+
+    threading.Thread(target=_calentar_pool, name="extraccion-warmup", daemon=True).start()
+
+
+def _calentar_pool():
+
+    # El pool está listo cuando EXTRACCION_WORKERS procesos distintos
+    # respondieron con el modelo calentado. Un worker que no pudo cargarlo
+    # deja el pool sin marcar como listo.
+
+    executor = get_executor()
+    listos = set()
+
+    for _ in range(INTENTOS_WARMUP):
+        futuros = [executor.submit(_ping) for _ in range(settings.EXTRACCION_WORKERS)]
+        wait(futuros)
+
+        for futuro in futuros:
+            if futuro.exception() is not None:
+                logger.error("Falló el warm-up del pool de extracción: %s", futuro.exception())
+                return
+            pid, listo = futuro.result()
+            if not listo:
+                logger.error("El worker %d no pudo calentar el modelo; el pool no queda listo", pid)
+                return
+            listos.add(pid)
+
+        if len(listos) >= settings.EXTRACCION_WORKERS:
+            break
+    else:
+        logger.error(
+            "Solo %d de %d workers respondieron al warm-up",
+            len(listos), settings.EXTRACCION_WORKERS
+        )
+        return
+
+    with _lock:
+        if executor is _executor:
+            _pool_listo.set()
+            logger.info("Pool de extracción listo (%d procesos)", settings.EXTRACCION_WORKERS)
+
+
+def _reiniciar_pool(roto):
+
+    # Descarta el pool roto (una sola vez aunque fallen varios trabajos) y
+    # lanza uno nuevo en segundo plano
+
+    global _executor
+
+    with _lock:
+        if _executor is not roto:
+            return
+        _executor = None
+        _pool_listo.clear()
+
+    with _lock_metricas:
+        _metricas["reinicios_pool"] += 1
+
+    logger.error("Un worker de extracción terminó inesperadamente; se recrea el pool")
+    roto.shutdown(wait=False, cancel_futures=True)
+    iniciar_extraccion()
+
+
+def _pool_roto(executor):
+    _reiniciar_pool(executor)
+    return ServiceError(
+        ResponseErrors.SERVICIO_SATURADO,
+        "El pool de extracción se está reiniciando",
+        headers={"Retry-After": str(settings.EXTRACCION_RETRY_AFTER_S)}
+    )
+
+
+def cerrar_extraccion():
+    global _executor
+
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+            _pool_listo.clear()
+
+
+def extraccion_lista():
+    return _pool_listo.is_set() if _modo_procesos() else modelo_listo()
+
+
+def _ejecutar_medido(funcion, args):
+
+    # En modo procesos las métricas del worker vuelven junto con el
+    # resultado para sumarlas en el proceso principal
+
+    inicio = time.time()
+    resultado = funcion(*args)
+    return inicio, resultado, metricas.extraer_delta() if _en_worker else None
+
+
+def _contar(carril, en_vuelo):
+
+    # Refleja en /metrics lo que está en el pool por carril
+
+    metricas.fijar("gd_extraccion_en_vuelo", en_vuelo, carril=carril)
+
+
+def _registrar_fin(carril, encolado, inicio, fin):
+    espera = max(0.0, inicio - encolado)
+    metricas.observar("gd_etapa_segundos", espera, etapa="espera_pool", carril=carril)
+    metricas.incrementar("gd_extracciones_total", carril=carril, resultado="ok")
+
+    with _lock_metricas:
+        if carril == "lote":
+            _metricas["procesadas_lote"] += 1
+            return
+        _metricas["procesadas"] += 1
+        _metricas["espera_total_s"] += espera
+        _metricas["espera_max_s"] = max(_metricas["espera_max_s"], espera)
+        _metricas["duracion_total_s"] += fin - inicio
+
+
+def _contar_error(carril):
+    metricas.incrementar("gd_extracciones_total", carril=carril, resultado="error")
+    with _lock_metricas:
+        _metricas["errores_lote" if carril == "lote" else "errores"] += 1
+
+
+def ejecutar_en_pool(funcion, *args):
+
+    # Versión bloqueante para hilos propios (los trabajos por lotes). Espera
+    # lugar en su carril en vez de rechazar, y cuenta en /ready y /metrics
+    # igual que las subidas interactivas.
+
+    with _semaforo_lote:
+        with _lock_metricas:
+            _metricas["en_vuelo_lote"] += 1
+            _contar("lote", _metricas["en_vuelo_lote"])
+        encolado = time.time()
+
+        executor = get_executor()
+        try:
+            inicio, resultado, delta = executor.submit(_ejecutar_medido, funcion, args).result()
+        except BrokenProcessPool:
+            _contar_error("lote")
+            raise _pool_roto(executor)
+        except Exception:
+            _contar_error("lote")
+            raise
+        finally:
+            with _lock_metricas:
+                _metricas["en_vuelo_lote"] -= 1
+                _contar("lote", _metricas["en_vuelo_lote"])
+
+    if delta:
+        metricas.fusionar(delta)
+    _registrar_fin("lote", encolado, inicio, time.time())
+    return resultado
+
+
+async def ejecutar_extraccion(funcion, *args):
+
+    # Corre funcion(*args) en el pool. Rechaza de inmediato si la cola está
+    # llena; los archivos de lotes en curso también ocupan lugar.
+
+    with _lock_metricas:
+        saturado = (
+            _metricas["en_vuelo"] + _metricas["en_vuelo_lote"] >= settings.EXTRACCION_MAX_EN_VUELO
+        )
+        if saturado:
+            _metricas["rechazadas"] += 1
+        else:
+            _metricas["en_vuelo"] += 1
+            _contar("interactiva", _metricas["en_vuelo"])
+
+    if saturado:
+        metricas.incrementar("gd_extracciones_total", carril="interactiva", resultado="rechazada")
+        raise ServiceError(
+            ResponseErrors.SERVICIO_SATURADO,
+            headers={"Retry-After": str(settings.EXTRACCION_RETRY_AFTER_S)}
+        )
+
+    encolado = time.time()
+    executor = get_executor()
+
+    try:
+        loop = asyncio.get_running_loop()
+        inicio, resultado, delta = await loop.run_in_executor(
+            executor, _ejecutar_medido, funcion, args
+        )
+    except BrokenProcessPool:
+        _contar_error("interactiva")
+        raise _pool_roto(executor)
+    except Exception:
+        _contar_error("interactiva")
+        raise
+    finally:
+        with _lock_metricas:
+            _metricas["en_vuelo"] -= 1
+            _contar("interactiva", _metricas["en_vuelo"])
+
+    if delta:
+        metricas.fusionar(delta)
+    _registrar_fin("interactiva", encolado, inicio, time.time())
+    return resultado
+
+
+def estado_extraccion():
+    with _lock_metricas:
+        m = dict(_metricas)
+
+    procesadas = m["procesadas"]
+    en_vuelo = m["en_vuelo"] + m["en_vuelo_lote"]
+
+    return {
+        "modo": settings.EXTRACCION_MODO,
+        "listo": extraccion_lista(),
+        "workers": settings.EXTRACCION_WORKERS,
+        "max_en_vuelo": settings.EXTRACCION_MAX_EN_VUELO,
+        "max_en_vuelo_lote": settings.EXTRACCION_MAX_EN_VUELO_LOTE,
+        "en_vuelo": m["en_vuelo"],
+        "en_vuelo_lote": m["en_vuelo_lote"],
+        "en_cola": max(0, en_vuelo - settings.EXTRACCION_WORKERS),
+        "procesadas": procesadas,
+        "procesadas_lote": m["procesadas_lote"],
+        "rechazadas": m["rechazadas"],
+        "errores": m["errores"],
+        "errores_lote": m["errores_lote"],
+        "reinicios_pool": m["reinicios_pool"],
+        "espera_media_ms": round(m["espera_total_s"] / procesadas * 1000, 1) if procesadas else 0.0,
+        "espera_max_ms": round(m["espera_max_s"] * 1000, 1),
+        "duracion_media_ms": round(m["duracion_total_s"] / procesadas * 1000, 1) if procesadas else 0.0,
+    }
@@ -1,11 +1,173 @@
-from sqlalchemy.orm import Session
+import base64
+import json
+import threading
+from collections import OrderedDict
+from sqlalchemy import insert, or_, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, selectinload
 from models.factura import Factura
 from models.proveedor import Proveedor
 from models.detalle_factura import DetalleFactura
-from datetime import datetime
+from datetime import datetime, date
 from sqlalchemy.exc import IntegrityError
 
-from shared.errores import ServiceError, ResponseErrors
+from core.config import settings
+
+from shared.errores import ServiceError, ResponseErrors, ERROR_RESPONSES
+from shared import metricas
+
+
+def consultar_facturas(db: Session):
+
+    # Proveedor y detalles se cargan en bloque (una consulta IN por relación)
+    # para que factura_to_response no dispare dos consultas por factura
+    return db.query(Factura).options(
+        selectinload(Factura.proveedor),
+        selectinload(Factura.detalles),
+    )
+
+
+# ==============================
+# LISTADO PAGINADO
+# ==============================
+# Paginación por cursor (keyset): el cursor guarda el orden, la dirección, el
+# valor de la columna de orden y el id de la última factura devuelta, así
+# cada página es una consulta por índice sin OFFSET. La continuación es una
+# comparación de filas (columna, id) > (valor, id), que usa los índices
+# compuestos (columna, id) en los dos sentidos.
+#
+# Los NULL (fecha o total sin leer) van siempre al final: se recorren primero
+# las filas con valor y, cuando se terminan, las filas NULL por id.
+
+COLUMNAS_ORDEN = {
+    "id": Factura.id,
+    "fecha": Factura.fecha,
+    "total": Factura.total,
+    "numero_factura": Factura.numero_factura,
+}
+
+COLUMNAS_CON_NULOS = {"fecha", "total"}
+
+
+def _codificar_cursor(orden, descendente, valor, factura_id):
+    if isinstance(valor, date):
+        valor = valor.isoformat()
+    crudo = json.dumps({
+        "orden": orden,
+        "direccion": "desc" if descendente else "asc",
+        "valor": valor,
+        "id": factura_id,
+    }).encode()
+    return base64.urlsafe_b64encode(crudo).decode()
+
+
+def _decodificar_cursor(cursor, orden, descendente):
+    try:
+        datos = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        valor, factura_id = datos["valor"], int(datos["id"])
+        if orden == "fecha" and valor is not None:
+            valor = date.fromisoformat(valor)
+    except Exception:
+        raise ServiceError(ResponseErrors.DATOS_INVALIDOS, "Cursor inválido")
+
+    # Un cursor solo vale para el orden con el que se generó
+    if datos.get("orden") != orden or datos.get("direccion") != ("desc" if descendente else "asc"):
+        raise ServiceError(
+            ResponseErrors.DATOS_INVALIDOS,
+            "El cursor corresponde a otro orden o dirección"
+        )
+
+    return valor, factura_id
+
+
+def _ordenar(query, columna, descendente):
+    if columna is Factura.id:
+        return query.order_by(Factura.id.desc() if descendente else Factura.id.asc())
+    return query.order_by(
+        columna.desc() if descendente else columna.asc(),
+        Factura.id.desc() if descendente else Factura.id.asc(),
+    )
+
+
+def _despues_de(columna, valor, factura_id, descendente):
+
+    # Filas que van después de (valor, id) en el orden columna, id
+
+    if columna is Factura.id:
+        return Factura.id < factura_id if descendente else Factura.id > factura_id
+
+    fila, limite = tuple_(columna, Factura.id), tuple_(valor, factura_id)
+    return fila < limite if descendente else fila > limite
+
+
+def listar_facturas(
+    db: Session,
+    filtros: dict,
+    orden: str = "fecha",
+    descendente: bool = True,
+    limite: int | None = None,
+    cursor: str | None = None,
+):
+
+    # Devuelve (facturas, siguiente_cursor); siguiente_cursor es None en la
+    # última página
+
+    if orden not in COLUMNAS_ORDEN:
+        raise ServiceError(
+            ResponseErrors.DATOS_INVALIDOS,
+            f"Orden inválido, opciones: {', '.join(COLUMNAS_ORDEN)}"
+        )
+
+    limite = min(limite or settings.LISTADO_POR_PAGINA, settings.LISTADO_MAX_POR_PAGINA)
+    columna = COLUMNAS_ORDEN[orden]
+    query = consultar_facturas(db)
+
+    if filtros.get("cuit_emisor") or filtros.get("razon_social") or filtros.get("busqueda"):
+        query = query.join(Factura.proveedor)
+    if filtros.get("cuit_emisor"):
+        query = query.filter(Proveedor.cuit_emisor == filtros["cuit_emisor"])
+    if filtros.get("razon_social"):
+        query = query.filter(Proveedor.razon_social.ilike(f"%{filtros['razon_social']}%"))
+    if filtros.get("busqueda"):
+        # Buscador de la lista: número de factura o proveedor
+        patron = f"%{filtros['busqueda']}%"
+        query = query.filter(or_(Factura.numero_factura.ilike(patron), Proveedor.razon_social.ilike(patron)))
+    if filtros.get("tipo_factura"):
+        query = query.filter(Factura.tipo_factura == filtros["tipo_factura"])
+    if filtros.get("fecha_desde"):
+        query = query.filter(Factura.fecha >= filtros["fecha_desde"])
+    if filtros.get("fecha_hasta"):
+        query = query.filter(Factura.fecha <= filtros["fecha_hasta"])
+    if filtros.get("total_min") is not None:
+        query = query.filter(Factura.total >= filtros["total_min"])
+    if filtros.get("total_max") is not None:
+        query = query.filter(Factura.total <= filtros["total_max"])
+
+    valor, factura_id = _decodificar_cursor(cursor, orden, descendente) if cursor else (None, None)
+
+    # Una fila de más para saber si hay otra página
+    facturas = []
+    con_nulos = orden in COLUMNAS_CON_NULOS
+
+    if not (con_nulos and cursor and valor is None):
+        tramo = query.filter(columna.isnot(None)) if con_nulos else query
+        if cursor:
+            tramo = tramo.filter(_despues_de(columna, valor, factura_id, descendente))
+        facturas = _ordenar(tramo, columna, descendente).limit(limite + 1).all()
+
+    if con_nulos and len(facturas) <= limite:
+        tramo = query.filter(columna.is_(None))
+        if cursor and valor is None:
+            tramo = tramo.filter(_despues_de(Factura.id, None, factura_id, descendente))
+        facturas += _ordenar(tramo, Factura.id, descendente).limit(limite + 1 - len(facturas)).all()
+
+    if len(facturas) <= limite:
+        return facturas, None
+
+    facturas = facturas[:limite]
+    ultima = facturas[-1]
+    return facturas, _codificar_cursor(orden, descendente, getattr(ultima, columna.key), ultima.id)
 
 
 def factura_to_response(factura: Factura):
@@ -28,142 +190,349 @@ def factura_to_response(factura: Factura):
     }
 
 
-def create_invoice(db: Session, data: dict):
-    fecha_str = data.get("fecha")
-    fecha = datetime.strptime(fecha_str, "%d/%m/%Y").date() if fecha_str else None
+# ==============================
+# PROVEEDORES
+# ==============================
+# El proveedor se resuelve con INSERT ... ON CONFLICT (cuit_emisor) DO
+# NOTHING y, si ya existía, un SELECT: sin carreras entre requests
+# concurrentes y sin escribir nada cuando el CUIT ya está. Delante hay una caché acotada CUIT ->
+# (id, razón social) que solo se completa después de un commit exitoso y se
+# invalida ante errores de integridad, así un proveedor repetido no cuesta
+# ninguna consulta.
 
-    # 🔹 Validar CUIT duplicado
-    existing_proveedor = db.query(Proveedor).filter(
-        Proveedor.cuit_emisor == data["cuit_emisor"],
-        Proveedor.razon_social != data["razon_social"]
-    ).first()
+_cache_proveedores = OrderedDict()
+_cache_lock = threading.Lock()
 
-    if existing_proveedor:
-        raise ServiceError(ResponseErrors.CUIT_DUPLICADO)
 
-    # 🔹 Obtener o crear proveedor
-    proveedor = db.query(Proveedor).filter(
-        Proveedor.cuit_emisor == data["cuit_emisor"],
-        Proveedor.razon_social == data["razon_social"]
-    ).first()
+def _proveedor_en_cache(cuit):
+    with _cache_lock:
+        proveedor = _cache_proveedores.get(cuit)
+        if proveedor is not None:
+            _cache_proveedores.move_to_end(cuit)
+        return proveedor
 
-    if not proveedor:
-        proveedor = Proveedor(
-            razon_social=data["razon_social"],
-            cuit_emisor=data["cuit_emisor"]
-        )
-        db.add(proveedor)
+
+def _cachear_proveedor(cuit, proveedor_id, razon_social):
+    with _cache_lock:
+        _cache_proveedores[cuit] = (proveedor_id, razon_social)
+        _cache_proveedores.move_to_end(cuit)
+        while len(_cache_proveedores) > settings.PROVEEDORES_CACHE_MAX:
+            _cache_proveedores.popitem(last=False)
+
+
+def _invalidar_proveedor(cuit):
+    with _cache_lock:
+        _cache_proveedores.pop(cuit, None)
+
+
+def _insertar_proveedor(db: Session, cuit: str, razon_social: str):
+
+    # INSERT ... ON CONFLICT DO NOTHING: si el CUIT ya existe no se escribe
+    # ninguna versión de la fila (un DO UPDATE sin cambios sí lo hace) y el
+    # proveedor se lee con un SELECT. Si otra transacción lo está creando, el
+    # INSERT espera a que termine y el SELECT ya ve la fila confirmada.
+
+    dialecto_insert = sqlite_insert if db.get_bind().dialect.name == "sqlite" else pg_insert
+    stmt = (
+        dialecto_insert(Proveedor)
+        .values(cuit_emisor=cuit, razon_social=razon_social)
+        .on_conflict_do_nothing(index_elements=["cuit_emisor"])
+        .returning(Proveedor.id, Proveedor.razon_social)
+    )
+
+    fila = db.execute(stmt).first()
+    if fila is None:
+        fila = db.execute(
+            select(Proveedor.id, Proveedor.razon_social).where(Proveedor.cuit_emisor == cuit)
+        ).one()
+    return tuple(fila)
+
+
+def _resolver_proveedor(db: Session, cuit: str, razon_social: str):
+
+    # Devuelve el id del proveedor (creándolo si no existe) dentro de la
+    # transacción actual, sin commit. CUIT_DUPLICADO si el CUIT ya es de un
+    # proveedor con otra razón social.
+
+    proveedor = _proveedor_en_cache(cuit)
+
+    if proveedor is None:
         try:
-            db.commit()
-            db.refresh(proveedor)
+            proveedor = _insertar_proveedor(db, cuit, razon_social)
         except Exception as e:
             db.rollback()
             raise ServiceError(ResponseErrors.ERROR_INTERNO, str(e))
 
-    # 🔹 Crear la factura
+    if proveedor[1] != razon_social:
+        db.rollback()
+        raise ServiceError(ResponseErrors.CUIT_DUPLICADO)
+
+    return proveedor[0]
+
+
+@metricas.medido("gd_db_segundos", operacion="crear")
+def create_invoice(db: Session, data: dict):
+    fecha_str = data.get("fecha")
+    fecha = datetime.strptime(fecha_str, "%d/%m/%Y").date() if fecha_str else None
+    cuit = data["cuit_emisor"]
+
+    proveedor_id = _resolver_proveedor(db, cuit, data["razon_social"])
+
+    # Proveedor, factura y detalles en un solo commit
     try:
         factura = Factura(
             numero_factura=data["numero_factura"],
             fecha=fecha,
             tipo_factura=data.get("tipo_factura"),
             total=data["total"],
-            proveedor_id=proveedor.id
+            proveedor_id=proveedor_id,
+            detalles=[
+                DetalleFactura(
+                    descripcion=item["descripcion"],
+                    cantidad=item["cantidad"],
+                    subtotal=item["subtotal"],
+                )
+                for item in data.get("tabla_items", [])
+            ],
         )
 
         db.add(factura)
         db.commit()
         db.refresh(factura)
 
-        for item in data.get("tabla_items", []):
-            detalle = DetalleFactura(
-                descripcion=item["descripcion"],
-                cantidad=item["cantidad"],
-                subtotal=item["subtotal"],
-                factura_id=factura.id
-            )
-            db.add(detalle)
-
-        db.commit()
-        db.refresh(factura)
-
     except IntegrityError:
         db.rollback()
+        _invalidar_proveedor(cuit)
         raise ServiceError(ResponseErrors.DATOS_DUPLICADOS, "Factura duplicada")
     except Exception as e:
         db.rollback()
+        _invalidar_proveedor(cuit)
         raise ServiceError(ResponseErrors.ERROR_INTERNO, str(e))
 
+    _cachear_proveedor(cuit, proveedor_id, data["razon_social"])
     return factura
 
 
+# ==============================
+# ALTA MASIVA
+# ==============================
+# Por cada bloque de BULK_TAMANO_LOTE facturas: una consulta para los números
+# ya existentes, una para los proveedores, y los INSERT de proveedores
+# nuevos, facturas y detalles como executemany, todo en una transacción.
+# Los errores (duplicadas, CUIT de otro proveedor) se informan por factura
+# sin cortar el resto del lote.
 
-def update_invoice(db: Session, invoice_id: int, data: dict):
+def resultado_error(error_key: ResponseErrors, detalle: str | None = None):
+    return {
+        "estado": "error",
+        "error": error_key.value,
+        "detalle": detalle or ERROR_RESPONSES[error_key.value]["message"],
+    }
 
-    factura = db.query(Factura).filter(Factura.id == invoice_id).first()
-    if not factura:
-        raise ServiceError(ResponseErrors.NO_ENCONTRADO)
 
+@metricas.medido("gd_db_segundos", operacion="crear_lote")
+def create_invoices_bulk(db: Session, items: list[tuple[int, dict]]):
 
-    existing_proveedor = db.query(Proveedor).filter(
-        Proveedor.cuit_emisor == data["cuit_emisor"],
-        Proveedor.razon_social != data["razon_social"]
-    ).first()
+    # items: lista de (indice, data) ya validados. Devuelve dict
+    # indice -> {"estado": "ok", "id": ...} o resultado_error(...)
 
-    if existing_proveedor:
-        raise ServiceError(
-            ResponseErrors.CUIT_DUPLICADO)
+    resultados = {}
+    vistos = set()  # números de factura ya aceptados en bloques anteriores
+
+    for inicio in range(0, len(items), settings.BULK_TAMANO_LOTE):
+        bloque = items[inicio:inicio + settings.BULK_TAMANO_LOTE]
+        resultados.update(_crear_bloque(db, bloque, vistos))
+
+    return resultados
+
+
+def _crear_bloque(db: Session, bloque, vistos):
+    resultados = {}
+
+    numeros = [data["numero_factura"] for _, data in bloque]
+    existentes = {
+        numero for (numero,) in
+        db.query(Factura.numero_factura).filter(Factura.numero_factura.in_(numeros))
+    }
+
+    cuits = {data["cuit_emisor"] for _, data in bloque}
+    proveedores = {
+        cuit: (proveedor_id, razon_social) for proveedor_id, cuit, razon_social in
+        db.query(Proveedor.id, Proveedor.cuit_emisor, Proveedor.razon_social)
+        .filter(Proveedor.cuit_emisor.in_(cuits))
+    }
+
+    validos = []
+    nuevos = {}  # cuit -> razon_social de proveedores a crear
+    for indice, data in bloque:
+        numero, cuit = data["numero_factura"], data["cuit_emisor"]
+
+        if numero in existentes or numero in vistos:
+            resultados[indice] = resultado_error(ResponseErrors.DATOS_DUPLICADOS, "Factura duplicada")
+            continue
 
+        razon_social = proveedores[cuit][1] if cuit in proveedores else nuevos.get(cuit)
+        if razon_social is not None and razon_social != data["razon_social"]:
+            resultados[indice] = resultado_error(ResponseErrors.CUIT_DUPLICADO)
+            continue
 
-    proveedor = db.query(Proveedor).filter(
-        Proveedor.cuit_emisor == data["cuit_emisor"],
-        Proveedor.razon_social == data["razon_social"]
-    ).first()
+        if cuit not in proveedores:
+            nuevos[cuit] = data["razon_social"]
+        vistos.add(numero)
+        validos.append((indice, data))
 
+    if not validos:
+        return resultados
 
-    if not proveedor:
-        proveedor = Proveedor(
-            razon_social=data["razon_social"],
-            cuit_emisor=data["cuit_emisor"]
+    try:
+        if nuevos:
+            filas = db.execute(
+                insert(Proveedor).returning(Proveedor.id, Proveedor.cuit_emisor),
+                [{"cuit_emisor": cuit, "razon_social": razon} for cuit, razon in nuevos.items()]
+            )
+            for proveedor_id, cuit in filas:
+                proveedores[cuit] = (proveedor_id, nuevos[cuit])
+
+        filas = db.execute(
+            insert(Factura).returning(Factura.id, Factura.numero_factura),
+            [
+                {
+                    "numero_factura": data["numero_factura"],
+                    "fecha": datetime.strptime(data["fecha"], "%d/%m/%Y").date() if data.get("fecha") else None,
+                    "tipo_factura": data.get("tipo_factura"),
+                    "total": data["total"],
+                    "proveedor_id": proveedores[data["cuit_emisor"]][0],
+                }
+                for _, data in validos
+            ]
         )
-        db.add(proveedor)
-        try:
-            db.commit()
-            db.refresh(proveedor)
-        except Exception as e:
-            db.rollback()
-            raise ServiceError(ResponseErrors.ERROR_INTERNO, str(e))
+        ids = {numero: factura_id for factura_id, numero in filas}
+
+        detalles = [
+            {
+                "descripcion": item["descripcion"],
+                "cantidad": item["cantidad"],
+                "subtotal": item["subtotal"],
+                "factura_id": ids[data["numero_factura"]],
+            }
+            for _, data in validos
+            for item in data.get("tabla_items", [])
+        ]
+        if detalles:
+            db.execute(insert(DetalleFactura), detalles)
+
+        db.commit()
+
+    except IntegrityError:
+        # Otra request insertó las mismas facturas o proveedores mientras
+        # tanto: el bloque se reintenta de a una para aislar los conflictos
+        db.rollback()
+        for indice, data in validos:
+            vistos.discard(data["numero_factura"])
+            resultados[indice] = _crear_individual(db, data)
+            if resultados[indice]["estado"] == "ok":
+                vistos.add(data["numero_factura"])
+        return resultados
+
+    except Exception as e:
+        db.rollback()
+        for indice, data in validos:
+            vistos.discard(data["numero_factura"])
+            resultados[indice] = resultado_error(ResponseErrors.ERROR_INTERNO, str(e))
+        return resultados
+
+    for cuit, (proveedor_id, razon_social) in proveedores.items():
+        _cachear_proveedor(cuit, proveedor_id, razon_social)
+
+    for indice, data in validos:
+        resultados[indice] = {"estado": "ok", "id": ids[data["numero_factura"]]}
+    return resultados
+
 
+def _crear_individual(db: Session, data: dict):
     try:
+        return {"estado": "ok", "id": create_invoice(db, data).id}
+    except ServiceError as e:
+        return resultado_error(e.error_key, e.detail)
+
+
+def _clave_item(descripcion, cantidad, subtotal):
+    return descripcion, cantidad, round(subtotal, 2)
+
+
+def _aplicar_diff_detalles(factura: Factura, items: list[dict]):
+
+    # Compara los detalles guardados con los recibidos por posición (la
+    # relación se carga ordenada por id, que es el orden de la tabla): la
+    # fila i se actualiza solo si cambió, las filas de más se borran y los
+    # items de más se insertan. Así un reordenamiento se guarda como UPDATEs
+    # y el orden se conserva. Devuelve False si no había nada que cambiar.
+
+    actuales = list(factura.detalles)
+    hubo_cambios = len(actuales) != len(items)
+
+    for detalle, item in zip(actuales, items):
+        if (_clave_item(detalle.descripcion, detalle.cantidad, detalle.subtotal)
+                == _clave_item(item["descripcion"], item["cantidad"], item["subtotal"])):
+            continue
+        detalle.descripcion = item["descripcion"]
+        detalle.cantidad = item["cantidad"]
+        detalle.subtotal = item["subtotal"]
+        hubo_cambios = True
+
+    for item in items[len(actuales):]:
+        factura.detalles.append(DetalleFactura(
+            descripcion=item["descripcion"],
+            cantidad=item["cantidad"],
+            subtotal=item["subtotal"],
+        ))
+
+    # delete-orphan: sacarlos de la relación los borra en el commit
+    for detalle in actuales[len(items):]:
+        factura.detalles.remove(detalle)
+
+    return hubo_cambios
+
+
+@metricas.medido("gd_db_segundos", operacion="actualizar")
+def update_invoice(db: Session, invoice_id: int, data: dict):
+
+    # Detalles y proveedor se cargan junto con la factura para el diff
+    factura = consultar_facturas(db).filter(Factura.id == invoice_id).first()
+    if not factura:
+        raise ServiceError(ResponseErrors.NO_ENCONTRADO)
 
+    cuit = data["cuit_emisor"]
+    proveedor_id = _resolver_proveedor(db, cuit, data["razon_social"])
+
+    # Encabezado y detalles en un solo commit; SQLAlchemy solo emite UPDATE
+    # de las columnas que cambiaron
+    try:
         factura.numero_factura = data["numero_factura"]
         factura.tipo_factura = data.get("tipo_factura")
         factura.fecha = datetime.strptime(data["fecha"], "%d/%m/%Y").date() if data.get("fecha") else None
         factura.total = data["total"]
-        factura.proveedor_id = proveedor.id
-
-
-        db.query(DetalleFactura).filter(DetalleFactura.factura_id == factura.id).delete()
-        db.commit()
-
+        factura.proveedor_id = proveedor_id
 
-        for item in data.get("tabla_items", []):
-            detalle = DetalleFactura(
-                descripcion=item["descripcion"],
-                cantidad=item["cantidad"],
-                subtotal=item["subtotal"],
-                factura_id=factura.id
-            )
-            db.add(detalle)
+        _aplicar_diff_detalles(factura, data.get("tabla_items", []))
 
         db.commit()
         db.refresh(factura)
-        return factura
 
+    except IntegrityError:
+        db.rollback()
+        _invalidar_proveedor(cuit)
+        raise ServiceError(ResponseErrors.DATOS_DUPLICADOS, "Factura duplicada")
     except Exception as e:
         db.rollback()
+        _invalidar_proveedor(cuit)
         raise ServiceError(ResponseErrors.ERROR_INTERNO, str(e))
 
+    _cachear_proveedor(cuit, proveedor_id, data["razon_social"])
+    return factura
+
 
+@metricas.medido("gd_db_segundos", operacion="eliminar")
 def delete_invoice(db: Session, invoice_id: int):
     factura = db.query(Factura).filter(Factura.id == invoice_id).first()
     if not factura:
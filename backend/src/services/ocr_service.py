@@ -1,5 +1,82 @@
-from OCR.extraer_ocr import extraer_factura_backend
+from starlette.concurrency import run_in_threadpool
+
+from OCR.extraer_ocr import extraer_factura_backend, extraer_facturas_backend_lote
+from services.documentos import iter_paginas_pdf, contar_paginas_pdf, decodificar_documento
+from services.ejecutor_extraccion import ejecutar_extraccion
+from services import cache_resultados
+from shared import metricas
+from shared.errores import ServiceError
 
 def process_invoice_img(img, filename: str | None = None):
     return extraer_factura_backend(img, filename)
 
+
+def extraer_documento(contents: bytes, filename: str, todas_las_paginas: bool = False):
+
+    # Decodificación + extracción completa a partir de los bytes subidos.
+    # Es la unidad de trabajo que corre en el pool de extracción.
+
+    es_pdf = filename.lower().endswith(".pdf")
+
+    if es_pdf and todas_las_paginas:
+        # Más allá de PDF_MAX_PAGINAS no se procesa: la respuesta lo indica
+        total = contar_paginas_pdf(contents)
+        paginas = []
+        iterador = iter_paginas_pdf(contents, max_paginas=None)
+        while True:
+            with metricas.medir("gd_etapa_segundos", etapa="rasterizacion_pdf"):
+                siguiente = next(iterador, None)
+            if siguiente is None:
+                break
+            numero, img = siguiente
+            paginas.append((numero, process_invoice_img(img, f"{filename}_p{numero}")))
+        return {"paginas": paginas, "paginas_totales": total, "truncado": total > len(paginas)}
+
+    with metricas.medir("gd_etapa_segundos", etapa="rasterizacion_pdf" if es_pdf else "decodificacion"):
+        img = decodificar_documento(contents, filename)
+    return process_invoice_img(img, filename)
+
+
+def extraer_documentos_lote(documentos):
+
+    # Unidad de trabajo de los trabajos por lotes: documentos es una lista de
+    # (bytes, nombre). Se decodifica la primera página de cada uno y todas
+    # pasan juntas por la detección por lotes. Devuelve, en el mismo orden,
+    # (resultado, None) o (None, error) por documento.
+
+    salidas = [None] * len(documentos)
+    paginas = []
+
+    for i, (contents, filename) in enumerate(documentos):
+        es_pdf = filename.lower().endswith(".pdf")
+        try:
+            with metricas.medir("gd_etapa_segundos", etapa="rasterizacion_pdf" if es_pdf else "decodificacion"):
+                paginas.append((i, decodificar_documento(contents, filename), filename))
+        except ServiceError as e:
+            salidas[i] = (None, e.detail or e.error_key.value)
+
+    resultados = extraer_facturas_backend_lote(
+        [(img, filename) for _, img, filename in paginas], len(paginas) or None
+    )
+    for (i, _, _), resultado in zip(paginas, resultados):
+        salidas[i] = (resultado, None)
+
+    return salidas
+
+
+async def procesar_subida(contents: bytes, filename: str, todas_las_paginas: bool = False):
+
+    # Un archivo idéntico a uno ya procesado se responde desde la caché
+    # sin pasar por la cola de extracción. El hash y el nivel de disco de la
+    # caché bloquean: corren en el threadpool y no en el event loop.
+
+    clave = await run_in_threadpool(cache_resultados.clave_contenido, contents, todas_las_paginas)
+    resultado = await run_in_threadpool(cache_resultados.obtener, clave)
+
+    if resultado is None:
+        resultado = await ejecutar_extraccion(
+            extraer_documento, contents, filename, todas_las_paginas
+        )
+        await run_in_threadpool(cache_resultados.guardar, clave, resultado)
+
+    return resultado
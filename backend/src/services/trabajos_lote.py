@@ -0,0 +1,401 @@
+import io
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+import uuid
+import zipfile
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from core.config import settings
+from services import cache_resultados
+from services.ejecutor_extraccion import ejecutar_en_pool
+from services.ocr_service import extraer_documento, extraer_documentos_lote
+from shared.errores import ServiceError, ResponseErrors
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo queda el lock dentro del proceso
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# ==============================
+# TRABAJOS DE EXTRACCIÓN POR LOTES
+# ==============================
+# Cada trabajo vive en TRABAJOS_DIR/<id>/: los archivos subidos en archivos/,
+# el trabajo en estado.json (se escribe al crearlo, al empezar y al
+# terminar) y el avance en progreso.jsonl, una línea por archivo procesado.
+# Al reiniciar el servidor los trabajos sin terminar se vuelven a encolar y
+# continúan desde los archivos pendientes.
+#
+# Los archivos se mandan al pool de a YOLO_BATCH_SIZE para usar la detección
+# por lotes. Con varios workers de uvicorn todos reencolan los mismos
+# trabajos: un flock sobre el directorio del trabajo hace que lo procese uno.
+
+BASE_DIR = Path(__file__).resolve().parents[2]  # .../backend
+
+TRABAJOS_DIR = Path(settings.TRABAJOS_DIR) if settings.TRABAJOS_DIR else BASE_DIR / "data" / "trabajos_lote"
+
+EXTENSIONES_VALIDAS = (".pdf", ".jpg", ".jpeg", ".png", ".tif", ".tiff", ".bmp", ".webp")
+
+_cola = queue.Queue()
+_locks = {}
+_locks_lock = threading.Lock()
+_hilos = []
+
+
+def _lock_trabajo(job_id):
+    with _locks_lock:
+        return _locks.setdefault(job_id, threading.Lock())
+
+
+def _ahora():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+# ==============================
+# PERSISTENCIA
+# ==============================
+
+def _dir_trabajo(job_id):
+    # job_id viene de la URL: solo se aceptan ids generados por nosotros
+    try:
+        uuid.UUID(hex=job_id)
+    except ValueError:
+        raise ServiceError(ResponseErrors.NO_ENCONTRADO)
+    return TRABAJOS_DIR / job_id
+
+
+def _leer_estado(job_id):
+    directorio = _dir_trabajo(job_id)
+    ruta = directorio / "estado.json"
+    if not ruta.exists():
+        raise ServiceError(ResponseErrors.NO_ENCONTRADO)
+    with open(ruta, "r", encoding="utf-8") as f:
+        estado = json.load(f)
+
+    _aplicar_progreso(estado, directorio / "progreso.jsonl")
+    return estado
+
+
+def _aplicar_progreso(estado, ruta):
+    if ruta.exists():
+        with open(ruta, "r", encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    avance = json.loads(linea)
+                except ValueError:
+                    continue  # línea cortada por una caída: el archivo sigue pendiente
+                estado["archivos"][avance["idx"]].update(
+                    estado=avance["estado"], resultado=avance["resultado"], error=avance["error"]
+                )
+                estado["actualizado"] = avance["actualizado"]
+
+    _contar_avance(estado)
+
+
+def _contar_avance(estado):
+    estado["procesados"] = sum(a["estado"] != "pendiente" for a in estado["archivos"])
+    estado["errores"] = sum(a["estado"] == "error" for a in estado["archivos"])
+
+
+def _guardar_estado(estado):
+    directorio = TRABAJOS_DIR / estado["id"]
+    tmp = directorio / "estado.json.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(estado, f, ensure_ascii=False)
+    os.replace(tmp, directorio / "estado.json")
+
+
+def _abrir_progreso(job_id):
+
+    # Si una caída dejó la última línea a medias se cierra, así la próxima
+    # no queda pegada a ella
+
+    ruta = TRABAJOS_DIR / job_id / "progreso.jsonl"
+    f = open(ruta, "a+b")
+    if f.tell() > 0:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b"\n":
+            f.write(b"\n")
+    return f
+
+
+@contextmanager
+def _reservar_trabajo(job_id):
+
+    # True si este proceso tomó el trabajo, False si ya lo tiene otro.
+    # flock se libera solo si el proceso muere.
+
+    with _lock_trabajo(job_id):
+        if fcntl is None:
+            yield True
+            return
+
+        with open(TRABAJOS_DIR / job_id / ".lock", "a") as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+# ==============================
+# ALTA DE TRABAJOS
+# ==============================
+
+def _validar_tamanio(nombre, tamanio):
+    if tamanio > settings.TRABAJOS_MAX_MB_ARCHIVO * 1024 * 1024:
+        raise ServiceError(
+            ResponseErrors.ARCHIVO_MUY_GRANDE,
+            f"{nombre} supera el tamaño máximo de {settings.TRABAJOS_MAX_MB_ARCHIVO} MB"
+        )
+
+
+def _expandir_archivos(archivos):
+
+    # archivos: lista de (nombre, bytes). Los .zip se abren y se toman
+    # los documentos que contienen.
+
+    for nombre, contents in archivos:
+        if nombre.lower().endswith(".zip"):
+            try:
+                with zipfile.ZipFile(io.BytesIO(contents)) as zf:
+                    for info in zf.infolist():
+                        interno = Path(info.filename).name
+                        if info.is_dir() or interno.startswith(".") or "__MACOSX" in info.filename:
+                            continue
+                        if not interno.lower().endswith(EXTENSIONES_VALIDAS):
+                            continue
+                        _validar_tamanio(interno, info.file_size)
+                        yield interno, zf.read(info)
+            except zipfile.BadZipFile:
+                raise ServiceError(ResponseErrors.DATOS_INVALIDOS, f"{nombre} no es un ZIP válido")
+        else:
+            _validar_tamanio(nombre, len(contents))
+            yield nombre, contents
+
+
+def crear_trabajo(archivos):
+    job_id = uuid.uuid4().hex
+    directorio = TRABAJOS_DIR / job_id / "archivos"
+    directorio.mkdir(parents=True, exist_ok=True)
+
+    try:
+        estado = _registrar_archivos(job_id, directorio, archivos)
+    except Exception:
+        shutil.rmtree(TRABAJOS_DIR / job_id, ignore_errors=True)
+        raise
+
+    _cola.put(job_id)
+    return resumen_trabajo(estado)
+
+
+def _registrar_archivos(job_id, directorio, archivos):
+    entradas = []
+    for idx, (nombre, contents) in enumerate(_expandir_archivos(archivos)):
+        if idx >= settings.TRABAJOS_MAX_ARCHIVOS:
+            raise ServiceError(
+                ResponseErrors.DATOS_INVALIDOS,
+                f"Un lote admite como máximo {settings.TRABAJOS_MAX_ARCHIVOS} archivos"
+            )
+
+        archivo = f"{idx:05d}_{Path(nombre).name}"
+        (directorio / archivo).write_bytes(contents)
+        entradas.append({
+            "nombre": nombre,
+            "archivo": archivo,
+            "estado": "pendiente",
+            "resultado": None,
+            "error": None,
+        })
+
+    if not entradas:
+        raise ServiceError(ResponseErrors.DATOS_INVALIDOS, "El lote no contiene archivos válidos")
+
+    estado = {
+        "id": job_id,
+        "estado": "pendiente",
+        "creado": _ahora(),
+        "actualizado": _ahora(),
+        "total": len(entradas),
+        "procesados": 0,
+        "errores": 0,
+        "archivos": entradas,
+    }
+    _guardar_estado(estado)
+    return estado
+
+
+# ==============================
+# PROCESAMIENTO
+# ==============================
+
+def _extraer_individual(contents, nombre):
+    try:
+        return ejecutar_en_pool(extraer_documento, contents, nombre), None
+    except ServiceError as e:
+        return None, e.detail or e.error_key.value
+    except Exception as e:
+        logger.error("Error procesando %s: %s", nombre, e)
+        return None, str(e)
+
+
+def _procesar_bloque(job_id, bloque):
+
+    # bloque: lista de (idx, entrada). Devuelve (resultado, error) por
+    # entrada. Lo que no está en la caché va al pool en una sola llamada
+    # (detección por lotes); si esa llamada falla se reintenta de a uno,
+    # para que un archivo roto no arrastre al resto del bloque.
+
+    salidas = [None] * len(bloque)
+    pendientes = []
+
+    for i, (_, entrada) in enumerate(bloque):
+        contents = (TRABAJOS_DIR / job_id / "archivos" / entrada["archivo"]).read_bytes()
+        clave = cache_resultados.clave_contenido(contents)
+        resultado = cache_resultados.obtener(clave)
+        if resultado is not None:
+            salidas[i] = (resultado, None)
+        else:
+            pendientes.append((i, clave, contents, entrada["nombre"]))
+
+    if not pendientes:
+        return salidas
+
+    try:
+        extraidos = ejecutar_en_pool(
+            extraer_documentos_lote, [(contents, nombre) for _, _, contents, nombre in pendientes]
+        )
+    except Exception as e:
+        logger.warning("Falló un bloque del lote %s, se reintenta por archivo: %s", job_id, e)
+        extraidos = [_extraer_individual(contents, nombre) for _, _, contents, nombre in pendientes]
+
+    for (i, clave, _, _), (resultado, error) in zip(pendientes, extraidos):
+        if error is None:
+            cache_resultados.guardar(clave, resultado)
+        salidas[i] = (resultado, error)
+
+    return salidas
+
+
+def _procesar_trabajo(job_id):
+    with _reservar_trabajo(job_id) as reservado:
+        if not reservado:
+            logger.info("El trabajo %s lo está procesando otro proceso", job_id)
+            return
+
+        estado = _leer_estado(job_id)
+        if estado["estado"] == "completado":
+            return
+
+        estado["estado"] = "procesando"
+        _guardar_estado(estado)
+
+        pendientes = [
+            (idx, entrada) for idx, entrada in enumerate(estado["archivos"])
+            if entrada["estado"] == "pendiente"
+        ]
+        tamanio = max(1, settings.YOLO_BATCH_SIZE)
+
+        with _abrir_progreso(job_id) as progreso:
+            for inicio in range(0, len(pendientes), tamanio):
+                bloque = pendientes[inicio:inicio + tamanio]
+
+                for (idx, entrada), (resultado, error) in zip(bloque, _procesar_bloque(job_id, bloque)):
+                    entrada.update(
+                        estado="ok" if error is None else "error", resultado=resultado, error=error
+                    )
+                    avance = {
+                        "idx": idx,
+                        "estado": entrada["estado"],
+                        "resultado": resultado,
+                        "error": error,
+                        "actualizado": _ahora(),
+                    }
+                    progreso.write((json.dumps(avance, ensure_ascii=False) + "\n").encode("utf-8"))
+                progreso.flush()
+
+        # El estado final ya incluye todos los resultados: el progreso sobra
+        estado["estado"] = "completado"
+        estado["actualizado"] = _ahora()
+        _contar_avance(estado)
+        _guardar_estado(estado)
+        (TRABAJOS_DIR / job_id / "progreso.jsonl").unlink(missing_ok=True)
+
+
+def _worker():
+    while True:
+        job_id = _cola.get()
+        try:
+            _procesar_trabajo(job_id)
+        except Exception as e:
+            logger.error("Falló el trabajo %s: %s", job_id, e)
+        finally:
+            _cola.task_done()
+
+
+def iniciar_trabajos():
+
+    # Lanza los hilos de procesamiento y reencola lo que quedó sin terminar
+
+    if _hilos:
+        return
+
+    TRABAJOS_DIR.mkdir(parents=True, exist_ok=True)
+
+    pendientes = []
+    for ruta in TRABAJOS_DIR.glob("*/estado.json"):
+        try:
+            estado = _leer_estado(ruta.parent.name)
+        except Exception as e:
+            logger.warning("No se pudo leer el trabajo %s: %s", ruta.parent.name, e)
+            continue
+        if estado["estado"] != "completado":
+            pendientes.append((estado["creado"], estado["id"]))
+
+    for _, job_id in sorted(pendientes):
+        _cola.put(job_id)
+
+    if pendientes:
+        logger.info("Se reanudan %d trabajos por lotes", len(pendientes))
+
+    for i in range(settings.TRABAJOS_WORKERS):
+        hilo = threading.Thread(target=_worker, name=f"trabajos-lote-{i}", daemon=True)
+        hilo.start()
+        _hilos.append(hilo)
+
+
+# ==============================
+# CONSULTAS
+# ==============================
+
+def resumen_trabajo(estado):
+    return {
+        "job_id": estado["id"],
+        "estado": estado["estado"],
+        "creado": estado["creado"],
+        "actualizado": estado["actualizado"],
+        "total": estado["total"],
+        "procesados": estado["procesados"],
+        "errores": estado["errores"],
+        "progreso": round(estado["procesados"] / estado["total"], 3),
+    }
+
+
+def obtener_trabajo(job_id):
+    return resumen_trabajo(_leer_estado(job_id))
+
+
+def obtener_resultados(job_id):
+    estado = _leer_estado(job_id)
+    return resumen_trabajo(estado), estado["archivos"]
@@ -40,6 +40,16 @@ ERROR_RESPONSES = {
         "status": status.HTTP_400_BAD_REQUEST,
         "error": "Bad Request"
     },
+    "archivo_muy_grande": {
+        "message": "El archivo supera el tamaño máximo permitido.",
+        "status": status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        "error": "Payload Too Large"
+    },
+    "servicio_saturado": {
+        "message": "El servidor está procesando demasiadas facturas. Intente nuevamente en unos segundos.",
+        "status": status.HTTP_503_SERVICE_UNAVAILABLE,
+        "error": "Service Unavailable"
+    },
 }
 
 class ResponseErrors(str, Enum):
@@ -50,15 +60,18 @@ class ResponseErrors(str, Enum):
     IMAGEN_INVALIDA = "imagen_invalida"
     PDF_INVALIDO = "pdf_invalido"
     CUIT_DUPLICADO = "cuit_duplicado"
+    ARCHIVO_MUY_GRANDE = "archivo_muy_grande"
+    SERVICIO_SATURADO = "servicio_saturado"
 
 
 class ServiceError(Exception):
-    def __init__(self, error_key: ResponseErrors, detail: str | None = None):
+    def __init__(self, error_key: ResponseErrors, detail: str | None = None, headers: dict | None = None):
         self.error_key = error_key
         self.detail = detail
+        self.headers = headers
 
 
-def raise_service_error(error_key: ResponseErrors, detail: str | None = None):
+def raise_service_error(error_key: ResponseErrors, detail: str | None = None, headers: dict | None = None):
     error = ERROR_RESPONSES[error_key.value]
 
     if detail:
@@ -72,5 +85,6 @@ def raise_service_error(error_key: ResponseErrors, detail: str | None = None):
         detail={
             "error": error["error"],
             "message": message
-        }
+        },
+        headers=headers
     )
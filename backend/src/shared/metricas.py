@@ -0,0 +1,182 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+
+from core.config import settings
+
+# ==============================
+# MÉTRICAS (FORMATO PROMETHEUS)
+# ==============================
+# Registro mínimo en memoria: histogramas de latencia, contadores y gauges
+# con etiquetas. Registrar cuesta un lock y una búsqueda binaria; el texto para
+# /metrics solo se arma cuando alguien lo pide.
+#
+# Con el pool de extracción en modo procesos cada worker acumula sus propias
+# métricas; extraer_delta() las devuelve (y las pone en cero) para que el
+# proceso principal las sume con fusionar(). Los gauges (fijar) son solo del
+# proceso principal y no viajan en el delta.
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+METRICAS = {
+    "gd_etapa_segundos": ("histogram", "Latencia por etapa del pipeline"),
+    "gd_ocr_campo_segundos": ("histogram", "Latencia de OCR por campo"),
+    "gd_db_segundos": ("histogram", "Latencia de operaciones de base de datos"),
+    "gd_detecciones_total": ("counter", "Detecciones por clase"),
+    "gd_ocr_vacios_total": ("counter", "Lecturas de OCR sin texto por campo"),
+    "gd_ocr_pasadas_total": ("counter", "Lecturas de OCR por campo (incluye reintentos)"),
+    "gd_plantillas_hits_total": ("counter", "Páginas detectadas con una plantilla conocida"),
+    "gd_plantillas_misses_total": ("counter", "Páginas sin plantilla conocida"),
+    "gd_plantillas_verificaciones_total": ("counter", "Coincidencias de plantilla verificadas con el modelo"),
+    "gd_plantillas_derivas_total": ("counter", "Plantillas reemplazadas al verificar"),
+    "gd_plantillas_ahorrado_segundos_total": ("counter", "Tiempo de detección estimado ahorrado por plantillas"),
+    "gd_extraccion_en_vuelo": ("gauge", "Trabajos en el pool de extracción por carril"),
+    "gd_extracciones_total": ("counter", "Extracciones por carril y resultado"),
+    "gd_debug_rois_total": ("counter", "ROIs de debug por evento (encolados, escritos, descartados, eliminados)"),
+}
+
+_lock = threading.Lock()
+_histogramas = {}  # (nombre, etiquetas) -> [conteo por bucket..., +Inf, suma]
+_contadores = {}   # (nombre, etiquetas) -> valor
+_gauges = {}       # (nombre, etiquetas) -> valor
+
+
+def _clave(nombre, etiquetas):
+    return nombre, tuple(sorted(etiquetas.items()))
+
+
+def observar(nombre, segundos, **etiquetas):
+    if not settings.METRICAS:
+        return
+
+    clave = _clave(nombre, etiquetas)
+    with _lock:
+        valores = _histogramas.get(clave)
+        if valores is None:
+            valores = _histogramas[clave] = [0] * (len(BUCKETS) + 1) + [0.0]
+        valores[bisect_left(BUCKETS, segundos)] += 1
+        valores[-1] += segundos
+
+
+def incrementar(nombre, valor=1, **etiquetas):
+    if not settings.METRICAS:
+        return
+
+    clave = _clave(nombre, etiquetas)
+    with _lock:
+        _contadores[clave] = _contadores.get(clave, 0) + valor
+
+
+def fijar(nombre, valor, **etiquetas):
+    if not settings.METRICAS:
+        return
+
+    with _lock:
+        _gauges[_clave(nombre, etiquetas)] = valor
+
+
+@contextmanager
+def medir(nombre, **etiquetas):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        observar(nombre, time.perf_counter() - inicio, **etiquetas)
+
+
+def medido(nombre, **etiquetas):
+
+    # Decorador equivalente a envolver la función en medir(...)
+
+    def decorador(funcion):
+        @wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with medir(nombre, **etiquetas):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def total(nombre):
+
+    # Suma de un contador sobre todas sus etiquetas (resúmenes de /ready)
+
+    with _lock:
+        return sum(v for (n, _), v in _contadores.items() if n == nombre)
+
+
+# ==============================
+# WORKERS
+# ==============================
+
+def extraer_delta():
+    global _histogramas, _contadores
+
+    with _lock:
+        delta = (_histogramas, _contadores)
+        _histogramas, _contadores = {}, {}
+    return delta
+
+
+def fusionar(delta):
+    histogramas, contadores = delta
+
+    with _lock:
+        for clave, valores in histogramas.items():
+            actuales = _histogramas.get(clave)
+            if actuales is None:
+                _histogramas[clave] = list(valores)
+            else:
+                for i, v in enumerate(valores):
+                    actuales[i] += v
+
+        for clave, valor in contadores.items():
+            _contadores[clave] = _contadores.get(clave, 0) + valor
+
+
+# ==============================
+# EXPOSICIÓN
+# ==============================
+
+def _etiquetas(etiquetas, extra=()):
+    pares = [f'{k}="{v}"' for k, v in (*etiquetas, *extra)]
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def exportar_texto():
+    with _lock:
+        histogramas = {clave: list(v) for clave, v in _histogramas.items()}
+        contadores = dict(_contadores)
+        gauges = dict(_gauges)
+
+    lineas = []
+    for nombre, (tipo, ayuda) in METRICAS.items():
+        lineas.append(f"# HELP {nombre} {ayuda}")
+        lineas.append(f"# TYPE {nombre} {tipo}")
+
+        if tipo in ("counter", "gauge"):
+            valores = contadores if tipo == "counter" else gauges
+            for (n, etiquetas), valor in sorted(valores.items()):
+                if n == nombre:
+                    lineas.append(f"{nombre}{_etiquetas(etiquetas)} {_numero(valor)}")
+            continue
+
+        for (n, etiquetas), valores in sorted(histogramas.items()):
+            if n != nombre:
+                continue
+            acumulado = 0
+            for limite, conteo in zip((*BUCKETS, "+Inf"), valores[:-1]):
+                acumulado += conteo
+                lineas.append(
+                    f"{nombre}_bucket{_etiquetas(etiquetas, [('le', limite)])} {acumulado}"
+                )
+            lineas.append(f"{nombre}_sum{_etiquetas(etiquetas)} {_numero(valores[-1])}")
+            lineas.append(f"{nombre}_count{_etiquetas(etiquetas)} {acumulado}")
+
+    return "\n".join(lineas) + "\n"
@@ -0,0 +1,48 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Los módulos del backend se importan desde src/ (como al correr uvicorn).
+# db.session crea su engine al importarse: sin Postgres, uno SQLite que los
+# tests reemplazan con dependency_overrides.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from models import Base  # noqa: E402
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def sesiones(engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture
+def consultas(engine):
+
+    # Lista de sentencias SQL ejecutadas; se vacía con consultas.clear()
+
+    sentencias = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        sentencias.append(statement)
+
+    event.listen(engine, "before_cursor_execute", registrar)
+    yield sentencias
+    event.remove(engine, "before_cursor_execute", registrar)
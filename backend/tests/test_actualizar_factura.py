@@ -0,0 +1,115 @@
+import pytest
+
+from services import invoice_service
+from services.invoice_service import (
+    consultar_facturas, create_invoice, factura_to_response, update_invoice
+)
+from models import Factura
+
+
+@pytest.fixture(autouse=True)
+def cache_vacia():
+    invoice_service._cache_proveedores.clear()
+    yield
+    invoice_service._cache_proveedores.clear()
+
+
+def item(descripcion, subtotal=10.0):
+    return {"descripcion": descripcion, "cantidad": 1, "subtotal": subtotal}
+
+
+def datos(items, tipo_factura="A"):
+    return {
+        "numero_factura": "00000001",
+        "fecha": "01/02/2024",
+        "tipo_factura": tipo_factura,
+        "razon_social": "Proveedor",
+        "cuit_emisor": "30712345678",
+        "tabla_items": items,
+        "total": sum(i["subtotal"] for i in items),
+    }
+
+
+@pytest.fixture
+def factura_id(sesiones):
+    with sesiones() as db:
+        return create_invoice(db, datos([item("A"), item("B"), item("C")])).id
+
+
+def actualizar(sesiones, consultas, factura_id, data):
+
+    # Devuelve las sentencias de escritura sobre detalle_factura y los
+    # items como quedan al volver a leer la factura
+
+    with sesiones() as db:
+        consultas.clear()
+        update_invoice(db, factura_id, data)
+        escrituras = [
+            c.split()[0].upper() for c in consultas
+            if "detalle_factura" in c and not c.lstrip().upper().startswith("SELECT")
+        ]
+
+    with sesiones() as db:
+        factura = consultar_facturas(db).filter(Factura.id == factura_id).one()
+        respuesta = factura_to_response(factura)
+        ids = [d.id for d in factura.detalles]
+
+    return escrituras, [i["descripcion"] for i in respuesta["tabla_items"]], ids
+
+
+def test_solo_encabezado_no_toca_detalles(sesiones, consultas, factura_id):
+    escrituras, descripciones, _ = actualizar(
+        sesiones, consultas, factura_id, datos([item("A"), item("B"), item("C")], tipo_factura="B")
+    )
+
+    assert escrituras == []
+    assert descripciones == ["A", "B", "C"]
+
+
+def test_agregar_item_inserta_una_fila(sesiones, consultas, factura_id):
+    escrituras, descripciones, _ = actualizar(
+        sesiones, consultas, factura_id, datos([item("A"), item("B"), item("C"), item("D")])
+    )
+
+    assert escrituras == ["INSERT"]
+    assert descripciones == ["A", "B", "C", "D"]
+
+
+def test_quitar_ultimo_item_borra_una_fila(sesiones, consultas, factura_id):
+    escrituras, descripciones, _ = actualizar(
+        sesiones, consultas, factura_id, datos([item("A"), item("B")])
+    )
+
+    assert escrituras == ["DELETE"]
+    assert descripciones == ["A", "B"]
+
+
+def test_cambiar_un_item_actualiza_solo_esa_fila(sesiones, consultas, factura_id):
+    escrituras, descripciones, _ = actualizar(
+        sesiones, consultas, factura_id, datos([item("A"), item("B", 20.0), item("C")])
+    )
+
+    assert escrituras == ["UPDATE"]
+    assert descripciones == ["A", "B", "C"]
+
+
+def test_quitar_item_del_medio_conserva_el_orden(sesiones, consultas, factura_id):
+    escrituras, descripciones, _ = actualizar(
+        sesiones, consultas, factura_id, datos([item("A"), item("C")])
+    )
+
+    assert sorted(escrituras) == ["DELETE", "UPDATE"]
+    assert descripciones == ["A", "C"]
+
+
+def test_reordenar_se_guarda_con_updates(sesiones, consultas, factura_id):
+    with sesiones() as db:
+        ids_antes = [d.id for d in db.get(Factura, factura_id).detalles]
+
+    escrituras, descripciones, ids = actualizar(
+        sesiones, consultas, factura_id, datos([item("C"), item("A"), item("B")])
+    )
+
+    assert escrituras and set(escrituras) == {"UPDATE"}
+    assert descripciones == ["C", "A", "B"]
+    assert ids == ids_antes
@@ -0,0 +1,169 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+
+from api.invoices import router
+from core.config import settings
+from db.session import get_db
+from models import Base, Factura, Proveedor
+from services import invoice_service
+from services.invoice_service import create_invoices_bulk
+
+
+@pytest.fixture(autouse=True)
+def cache_vacia():
+    invoice_service._cache_proveedores.clear()
+    yield
+    invoice_service._cache_proveedores.clear()
+
+
+@pytest.fixture
+def cliente(sesiones):
+    app = FastAPI()
+    app.include_router(router)
+
+    def db_de_prueba():
+        with sesiones() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = db_de_prueba
+    return TestClient(app)
+
+
+def factura(numero, cuit="30712345678", razon_social="Proveedor", total=10.0):
+    return {
+        "numero_factura": numero,
+        "fecha": "01/02/2024",
+        "tipo_factura": "A",
+        "razon_social": razon_social,
+        "cuit_emisor": cuit,
+        "tabla_items": [{"descripcion": "Item", "cantidad": 1, "subtotal": 10.0}],
+        "total": total,
+    }
+
+
+def estados(resultados):
+    return [resultados[i]["estado"] if resultados[i]["estado"] == "ok" else resultados[i]["error"]
+            for i in sorted(resultados)]
+
+
+# ==============================
+# ENDPOINT
+# ==============================
+
+def test_respuesta_con_errores_de_validacion_por_factura(cliente, sesiones):
+    respuesta = cliente.post("/facturas/bulk", json=[
+        factura("00000001"),
+        factura("00000002", cuit="123"),
+        factura("00000003", total=99.0),
+    ])
+
+    assert respuesta.status_code == 200
+    cuerpo = respuesta.json()
+    assert (cuerpo["total"], cuerpo["creadas"], cuerpo["errores"]) == (3, 1, 2)
+
+    ok, cuit, total = cuerpo["resultados"]
+    assert set(ok) == {"indice", "estado", "id"}
+    assert (ok["indice"], ok["estado"]) == (0, "ok")
+    assert set(cuit) == {"indice", "estado", "error", "detalle"}
+    assert (cuit["indice"], cuit["error"]) == (1, "datos_invalidos")
+    assert "cuit_emisor" in cuit["detalle"]
+    assert (total["indice"], total["error"]) == (2, "datos_invalidos")
+
+    with sesiones() as db:
+        assert [f.id for f in db.query(Factura)] == [ok["id"]]
+
+
+def test_rechaza_lotes_demasiado_grandes(cliente, monkeypatch):
+    monkeypatch.setattr(settings, "BULK_MAX_FACTURAS", 2)
+
+    respuesta = cliente.post("/facturas/bulk", json=[factura(f"{i:08d}") for i in range(3)])
+
+    assert respuesta.status_code == 400
+
+
+# ==============================
+# DUPLICADAS
+# ==============================
+
+@pytest.mark.parametrize("tamano_lote", [500, 1])
+def test_numero_repetido_dentro_del_pedido(sesiones, monkeypatch, tamano_lote):
+    # Con tamaño 1 la repetida cae en otro bloque
+    monkeypatch.setattr(settings, "BULK_TAMANO_LOTE", tamano_lote)
+
+    with sesiones() as db:
+        resultados = create_invoices_bulk(db, [
+            (0, factura("00000001")),
+            (1, factura("00000001")),
+            (2, factura("00000002")),
+        ])
+        assert db.query(Factura).count() == 2
+
+    assert estados(resultados) == ["ok", "datos_duplicados", "ok"]
+
+
+def test_numero_existente_en_la_base(sesiones):
+    with sesiones() as db:
+        create_invoices_bulk(db, [(0, factura("00000001"))])
+
+        resultados = create_invoices_bulk(db, [(0, factura("00000001")), (1, factura("00000002"))])
+        assert db.query(Factura).count() == 2
+
+    assert estados(resultados) == ["datos_duplicados", "ok"]
+
+
+def test_cuit_con_otra_razon_social(sesiones):
+    with sesiones() as db:
+        resultados = create_invoices_bulk(db, [
+            (0, factura("00000001")),
+            (1, factura("00000002", razon_social="Otro")),
+        ])
+        assert db.query(Proveedor).count() == 1
+
+    assert estados(resultados) == ["ok", "cuit_duplicado"]
+
+
+# ==============================
+# CONFLICTO CONCURRENTE
+# ==============================
+
+def test_integrity_error_reintenta_de_a_una(tmp_path):
+
+    # Otra conexión guarda el mismo número entre la consulta de existentes y
+    # el INSERT del bloque: el bloque falla y se reintenta factura por factura
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'facturas.db'}")
+    Base.metadata.create_all(engine)
+    sesiones = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    intercalada = []
+
+    def insertar_en_paralelo(conn, cursor, statement, parameters, context, executemany):
+        if intercalada or "SELECT facturas.numero_factura" not in statement:
+            return
+        intercalada.append(statement)
+        with engine.begin() as otra:
+            otra.execute(text(
+                "INSERT INTO proveedores (razon_social, cuit_emisor) VALUES ('Otro', '30000000009')"
+            ))
+            otra.execute(text(
+                "INSERT INTO facturas (numero_factura, proveedor_id) VALUES ('00000002', 1)"
+            ))
+
+    event.listen(engine, "after_cursor_execute", insertar_en_paralelo)
+    try:
+        with sesiones() as db:
+            resultados = create_invoices_bulk(db, [
+                (0, factura("00000001")),
+                (1, factura("00000002")),
+                (2, factura("00000003")),
+            ])
+            numeros = sorted(n for (n,) in db.query(Factura.numero_factura))
+    finally:
+        event.remove(engine, "after_cursor_execute", insertar_en_paralelo)
+        engine.dispose()
+
+    assert intercalada
+    assert estados(resultados) == ["ok", "datos_duplicados", "ok"]
+    assert numeros == ["00000001", "00000002", "00000003"]
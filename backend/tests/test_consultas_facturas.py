@@ -0,0 +1,52 @@
+from datetime import date
+
+import pytest
+
+from models import Factura, Proveedor, DetalleFactura
+from services.invoice_service import consultar_facturas, factura_to_response
+
+
+def cargar_facturas(sesiones, cantidad):
+    with sesiones() as db:
+        for i in range(cantidad):
+            proveedor = Proveedor(razon_social=f"Proveedor {i}", cuit_emisor=f"30{i:09d}")
+            db.add(Factura(
+                numero_factura=f"{i:08d}",
+                fecha=date(2024, 1, 1 + i % 28),
+                tipo_factura="A",
+                total=30.0,
+                proveedor=proveedor,
+                detalles=[
+                    DetalleFactura(descripcion=f"Item {j}", cantidad=1, subtotal=10.0)
+                    for j in range(3)
+                ],
+            ))
+        db.commit()
+
+
+@pytest.mark.parametrize("cantidad", [1, 25])
+def test_listado_usa_consultas_constantes(sesiones, consultas, cantidad):
+    cargar_facturas(sesiones, cantidad)
+
+    with sesiones() as db:
+        consultas.clear()
+        respuesta = [factura_to_response(f) for f in consultar_facturas(db).all()]
+
+    assert len(respuesta) == cantidad
+    assert all(len(f["tabla_items"]) == 3 and f["razon_social"] for f in respuesta)
+    # facturas + proveedores (IN) + detalles (IN)
+    assert len(consultas) == 3
+
+
+@pytest.mark.parametrize("cantidad", [1, 25])
+def test_detalle_usa_consultas_constantes(sesiones, consultas, cantidad):
+    cargar_facturas(sesiones, cantidad)
+
+    with sesiones() as db:
+        consultas.clear()
+        factura = consultar_facturas(db).filter(Factura.id == cantidad).first()
+        respuesta = factura_to_response(factura)
+
+    assert respuesta["numero_factura"] == f"{cantidad - 1:08d}"
+    assert len(respuesta["tabla_items"]) == 3
+    assert len(consultas) == 3
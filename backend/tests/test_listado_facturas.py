@@ -0,0 +1,78 @@
+from datetime import date
+
+import pytest
+
+from models import Factura, Proveedor
+from services.invoice_service import listar_facturas
+from shared.errores import ServiceError, ResponseErrors
+
+
+@pytest.fixture
+def facturas(sesiones):
+
+    # 23 facturas con fechas y totales repetidos y algunos NULL
+
+    with sesiones() as db:
+        proveedor = Proveedor(razon_social="Proveedor", cuit_emisor="30712345678")
+        for i in range(23):
+            db.add(Factura(
+                numero_factura=f"{(i * 7) % 23:08d}",
+                fecha=None if i % 5 == 0 else date(2024, 1, 1 + i % 4),
+                tipo_factura="A",
+                total=None if i % 6 == 0 else float(i % 3) * 10,
+                proveedor=proveedor,
+            ))
+        db.commit()
+
+
+def recorrer(sesiones, orden, descendente, limite):
+    ids, cursor = [], None
+    with sesiones() as db:
+        while True:
+            pagina, cursor = listar_facturas(db, {}, orden, descendente, limite, cursor)
+            ids += [f.id for f in pagina]
+            if cursor is None:
+                return ids
+
+
+def orden_esperado(sesiones, orden, descendente):
+    with sesiones() as db:
+        filas = [(getattr(f, orden), f.id) for f in db.query(Factura).all()]
+
+    con_valor = sorted((f for f in filas if f[0] is not None), reverse=descendente)
+    nulos = sorted((f for f in filas if f[0] is None), reverse=descendente)
+    return [factura_id for _, factura_id in con_valor + nulos]
+
+
+@pytest.mark.parametrize("orden", ["id", "fecha", "total", "numero_factura"])
+@pytest.mark.parametrize("descendente", [True, False])
+@pytest.mark.parametrize("limite", [1, 4, 50])
+def test_paginas_recorren_el_orden_completo(sesiones, facturas, orden, descendente, limite):
+    assert recorrer(sesiones, orden, descendente, limite) == orden_esperado(sesiones, orden, descendente)
+
+
+@pytest.mark.parametrize("orden, descendente", [("total", True), ("fecha", False)])
+def test_cursor_de_otro_orden_es_invalido(sesiones, facturas, orden, descendente):
+    with sesiones() as db:
+        _, cursor = listar_facturas(db, {}, "fecha", True, 5)
+
+        with pytest.raises(ServiceError) as error:
+            listar_facturas(db, {}, orden, descendente, 5, cursor)
+
+    assert error.value.error_key == ResponseErrors.DATOS_INVALIDOS
+
+
+def test_busqueda_por_numero_o_proveedor(sesiones, facturas):
+    with sesiones() as db:
+        db.add(Factura(
+            numero_factura="99999999",
+            tipo_factura="B",
+            proveedor=Proveedor(razon_social="Distribuidora Sur", cuit_emisor="30799999999"),
+        ))
+        db.commit()
+
+        por_numero, _ = listar_facturas(db, {"busqueda": "00000007"}, "id", False, 50)
+        por_proveedor, _ = listar_facturas(db, {"busqueda": "sur"}, "id", False, 50)
+
+    assert [f.numero_factura for f in por_numero] == ["00000007"]
+    assert [f.numero_factura for f in por_proveedor] == ["99999999"]
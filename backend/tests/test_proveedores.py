@@ -0,0 +1,122 @@
+import pytest
+
+from core.config import settings
+from models import Factura, Proveedor
+from services import invoice_service
+from services.invoice_service import create_invoice, _resolver_proveedor
+from shared.errores import ServiceError, ResponseErrors
+
+
+@pytest.fixture(autouse=True)
+def cache_vacia():
+    invoice_service._cache_proveedores.clear()
+    yield
+    invoice_service._cache_proveedores.clear()
+
+
+def factura(numero, cuit="30712345678", razon_social="Proveedor"):
+    return {
+        "numero_factura": numero,
+        "fecha": "01/02/2024",
+        "tipo_factura": "A",
+        "razon_social": razon_social,
+        "cuit_emisor": cuit,
+        "tabla_items": [{"descripcion": "Item", "cantidad": 1, "subtotal": 10.0}],
+        "total": 10.0,
+    }
+
+
+# ==============================
+# UPSERT
+# ==============================
+
+def test_upsert_crea_el_proveedor(sesiones):
+    with sesiones() as db:
+        proveedor_id = _resolver_proveedor(db, "30712345678", "Proveedor")
+        db.commit()
+
+        proveedor = db.get(Proveedor, proveedor_id)
+        assert (proveedor.cuit_emisor, proveedor.razon_social) == ("30712345678", "Proveedor")
+
+
+def test_upsert_de_cuit_existente_no_escribe(sesiones, consultas):
+    with sesiones() as db:
+        db.add(Proveedor(razon_social="Proveedor", cuit_emisor="30712345678"))
+        db.commit()
+        existente = db.query(Proveedor.id).scalar()
+
+        consultas.clear()
+        assert _resolver_proveedor(db, "30712345678", "Proveedor") == existente
+        db.commit()
+
+    # INSERT ... DO NOTHING sin fila devuelta, y el SELECT
+    assert len(consultas) == 2
+    assert not any(c.lstrip().upper().startswith("UPDATE") for c in consultas)
+
+
+def test_upsert_con_otra_razon_social_es_cuit_duplicado(sesiones):
+    with sesiones() as db:
+        db.add(Proveedor(razon_social="Proveedor", cuit_emisor="30712345678"))
+        db.commit()
+
+        with pytest.raises(ServiceError) as error:
+            _resolver_proveedor(db, "30712345678", "Otro")
+
+    assert error.value.error_key == ResponseErrors.CUIT_DUPLICADO
+
+
+# ==============================
+# CACHÉ
+# ==============================
+
+def test_proveedor_repetido_sale_de_la_cache(sesiones, consultas):
+    with sesiones() as db:
+        create_invoice(db, factura("00000001"))
+
+        consultas.clear()
+        create_invoice(db, factura("00000002"))
+
+    assert not any("proveedores" in c and "facturas" not in c for c in consultas)
+    assert "30712345678" in invoice_service._cache_proveedores
+
+
+def test_cache_desaloja_el_menos_usado(sesiones, monkeypatch):
+    monkeypatch.setattr(settings, "PROVEEDORES_CACHE_MAX", 2)
+
+    with sesiones() as db:
+        create_invoice(db, factura("00000001", cuit="30000000001"))
+        create_invoice(db, factura("00000002", cuit="30000000002"))
+        create_invoice(db, factura("00000003", cuit="30000000001"))  # vuelve a ser el más reciente
+        create_invoice(db, factura("00000004", cuit="30000000003"))
+
+    assert list(invoice_service._cache_proveedores) == ["30000000001", "30000000003"]
+
+
+def test_rollback_no_deja_proveedores_en_cache(sesiones):
+    with sesiones() as db:
+        create_invoice(db, factura("00000001", cuit="30000000001"))
+
+        # Número repetido: se revierte también el proveedor recién insertado
+        with pytest.raises(ServiceError) as error:
+            create_invoice(db, factura("00000001", cuit="30000000002"))
+        assert error.value.error_key == ResponseErrors.DATOS_DUPLICADOS
+
+        assert "30000000002" not in invoice_service._cache_proveedores
+        assert db.query(Proveedor).filter_by(cuit_emisor="30000000002").count() == 0
+
+        # El CUIT vuelve a resolverse contra la base y se crea de nuevo
+        creada = create_invoice(db, factura("00000002", cuit="30000000002"))
+        assert creada.proveedor.cuit_emisor == "30000000002"
+        assert "30000000002" in invoice_service._cache_proveedores
+
+
+def test_error_de_integridad_invalida_el_cuit(sesiones):
+    with sesiones() as db:
+        create_invoice(db, factura("00000001"))
+        assert "30712345678" in invoice_service._cache_proveedores
+
+        with pytest.raises(ServiceError):
+            create_invoice(db, factura("00000001"))
+
+        assert "30712345678" not in invoice_service._cache_proveedores
+        assert db.query(Factura).count() == 1
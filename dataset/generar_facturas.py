@@ -31,7 +31,12 @@ YOLO_CLASS_MAP = {
 # HELPERS
 
 def gen_cuit():
-    return f"{random.choice([20,23,27,30])}-{random.randint(10000000,99999999)}-{random.randint(0,9)}"
+    # con dígito verificador válido (módulo 11)
+    while True:
+        base = f"{random.choice([20,23,27,30])}{random.randint(10000000,99999999)}"
+        resto = sum(int(d) * m for d, m in zip(base, (5,4,3,2,7,6,5,4,3,2))) % 11
+        if resto != 1:
+            return f"{base[:2]}-{base[2:]}-{(11 - resto) % 11}"
 
 def money(v):
     return f"$ {v:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")